@@ -0,0 +1,79 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-19
+# Notes: Offline benchmark of ACC report ingestion
+# on a synthetic workbook shaped like the ACC
+# downloads (a product/metric column, then one
+# column per month, some blanks). Compares parse
+# time per Excel engine (read_excel_bytes) and
+# CSV vs typed Parquet output size and write time.
+# Run from the project root:
+#   python -m acc.bench.bench_excel --rows 2000 --months 120
+####################################
+
+import io, time, argparse
+import numpy as np
+import pandas as pd
+import openpyxl
+import acc.src.pull_acc_data as pull_acc
+
+
+def build_workbook(n_rows, n_months, seed=0):
+    '''xlsx bytes: Product, Metric, then one column per month.'''
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("2000-01-01", periods=n_months, freq="MS").strftime("%Y-%m").to_list()
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(["Product", "Metric"] + months)
+    for n in range(n_rows):
+        values = np.round(rng.uniform(0, 5000, n_months), 3).tolist()
+        for k in rng.choice(n_months, size=n_months // 20, replace=False): values[k] = None
+        worksheet.append([f"Product {n // 10}", f"Metric {n % 10}"] + values)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def _best_of(repeat, fn, *args, **kwargs):
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(*args, **kwargs)
+        walls.append(time.perf_counter() - start)
+    return out, min(walls)
+
+def main(n_rows, n_months, repeat, seed):
+    xlsx_bytes = build_workbook(n_rows, n_months, seed)
+    print(f"rows={n_rows} months={n_months} xlsx={len(xlsx_bytes)/1e6:.2f} MB")
+
+    engines = ["pandas", "openpyxl_stream"] + (["calamine"] if pull_acc.python_calamine is not None else [])
+    frames = {}
+    for engine in engines:
+        frames[engine], wall = _best_of(repeat, pull_acc.read_excel_bytes, xlsx_bytes, engine=engine)
+        print(f"  parse {engine:16s} {wall:8.3f} s")
+    reference = frames["pandas"]
+    for engine, df in frames.items():
+        if engine == "pandas": continue
+        b_same = df.shape == reference.shape and np.allclose(df.iloc[:, 2:].astype(float), reference.iloc[:, 2:].astype(float), equal_nan=True)
+        print(f"  {engine} matches pandas: {b_same}")
+
+    def _to_csv_bytes(df):
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False)
+        return buffer.getvalue().encode("utf-8")
+
+    csv_bytes, csv_wall = _best_of(repeat, _to_csv_bytes, reference)
+    parquet_bytes, parquet_wall = _best_of(repeat, pull_acc.to_typed_parquet_bytes, reference)
+    print(f"  write csv     {csv_wall:8.3f} s, {len(csv_bytes)/1e6:8.2f} MB")
+    print(f"  write parquet {parquet_wall:8.3f} s, {len(parquet_bytes)/1e6:8.2f} MB")
+    _, csv_read_wall = _best_of(repeat, lambda: pd.read_csv(io.BytesIO(csv_bytes)))
+    _, parquet_read_wall = _best_of(repeat, lambda: pd.read_parquet(io.BytesIO(parquet_bytes)))
+    print(f"  read back csv {csv_read_wall:8.3f} s, parquet {parquet_read_wall:8.3f} s")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=1000)
+    arg_parser.add_argument("--months", type=int, default=120)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+    main(args.rows, args.months, args.repeat, args.seed)
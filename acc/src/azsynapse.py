@@ -0,0 +1,58 @@
+#####################################################
+# Author: Jon Willinger
+#
+# Date: 2025-03-24
+#
+# Version: 0.0.1
+#
+# Notes: Synapse connection (managed identity) and
+# the table the ACC reports load into.
+# 
+#####################################################
+
+import datetime
+import sqlalchemy as sa
+from sqlalchemy.orm import DeclarativeBase, mapped_column
+try: import acc.src.connections as conn
+except ModuleNotFoundError: import connections as conn
+
+class AzureSynapseInstance():
+    
+    def __init__(self, driver, host, port, database, timeout):
+
+        azconnection = conn.AzConnectMI(driver=driver, host=host, port=port, database=database, timeout=timeout)
+        self.engine = azconnection.engine
+        self.credential = azconnection.credential
+        self.connection = self.engine.connect()
+        self._Base = self._get_class_Base()
+
+    def close_connection(self):
+        try: self.connection.close()
+        except: pass
+
+    def dispose(self):
+        try: self.connection.close()
+        except: pass
+        self.engine.dispose()
+
+    def _get_class_Base(self):
+        class Base(DeclarativeBase):
+            pass
+        return Base
+
+    def get_tbl_stg_ACCReports(self):
+        class tbl_stg_ACCReports(self._Base):
+            __tablename__ = "ACCReports"
+            __table_args__ = {"schema": "stg"}
+            report: sa.orm.Mapped[str] = mapped_column("Report", sa.String(256), primary_key=True)
+            product: sa.orm.Mapped[str] = mapped_column("Product", sa.String(256), primary_key=True)
+            period: sa.orm.Mapped[datetime.date] = mapped_column("Period", sa.Date, primary_key=True)
+            metric: sa.orm.Mapped[str] = mapped_column("Metric", sa.String(256), primary_key=True)
+            value: sa.orm.Mapped[float] = mapped_column("Value", sa.Float, nullable=True)
+            last_updated: sa.orm.Mapped[datetime.datetime] = mapped_column("LastUpdated", sa.DATETIME, nullable=True)
+        
+        return tbl_stg_ACCReports
+
+
+if __name__ == "__main__":
+    pass
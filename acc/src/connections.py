@@ -0,0 +1,49 @@
+#####################################################
+# Author: Jon Willinger
+#
+# Date: 2025-03-24
+#
+# Version: 0.0.1
+#
+# Notes: Connections are made via the Managed 
+# Identity. Local development requires az cli; token
+# reinjection is automated.
+# 
+#####################################################
+
+import struct
+import pyodbc, sqlalchemy as sa
+from azure import identity
+
+SQL_COPT_SS_ACCESS_TOKEN = 1256 # As defined in msodbcsql.h
+
+pyodbc.pooling = False
+
+
+# Microsoft Managed Identity:
+# ```````````````````````````
+# No passwords, more secure. Local dev requires az cli
+class AzConnectMI():
+
+    def __init__(self, driver, host, port, database, timeout):
+        credential = identity.DefaultAzureCredential()
+        connection_string = f"Driver={driver};Server={host};Port={port};Database={database};Encrypt=yes;TrustServerCertificate=no;Connection Timeout={timeout};"
+        engine = sa.create_engine(
+            sa.engine.URL.create("mssql+pyodbc", query={"odbc_connect": connection_string, "autocommit":"true"})
+        ).execution_options(isolation_level="AUTOCOMMIT")
+        self._inject_azure_credential(credential, engine)
+        self.engine = engine
+        self.credential = credential
+
+    def _inject_azure_credential(self, credential, engine, token_url='https://database.windows.net/'):
+        @sa.event.listens_for(engine, 'do_connect')
+        def do_connect(dialect, conn_rec, cargs, cparams):
+            token = credential.get_token(token_url).token.encode('utf-16-le')
+            token_struct = struct.pack(f'=I{len(token)}s', len(token), token)
+            attrs_before = cparams.setdefault('attrs_before', {})
+            attrs_before[SQL_COPT_SS_ACCESS_TOKEN] = bytes(token_struct)
+            return dialect.connect(*cargs, **cparams)
+
+
+if __name__ == "__main__":
+    pass
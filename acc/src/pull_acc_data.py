@@ -1,13 +1,157 @@
 import os, datetime, pathlib as path
-import tempfile, json
+import json, threading, io
+import time, base64, hashlib, tempfile
 import requests
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import pandas as pd
+import openpyxl
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
 from bs4 import BeautifulSoup
 from azure.storage.blob import BlobServiceClient
+from azure.core.exceptions import ResourceNotFoundError
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import azure.identity
 from azure.keyvault.secrets import SecretClient
+try: import acc.src.azsynapse as azsyn
+except ModuleNotFoundError: import azsynapse as azsyn
+try: import acc.src.http_cache as http_cache
+except ModuleNotFoundError: import http_cache
+try: import python_calamine # Optional fast reader (Rust); openpyxl streaming otherwise.
+except ModuleNotFoundError: python_calamine = None
 
 PROJECT_DIR = path.Path(__file__).parent.parent.parent
+ACC_REPORTS_URL = "https://pips.vaultconsulting.com/reports/myreports_read"
+ACC_CACHE_TTL = 60 * 60 # Report listing.
+ACC_MAX_WORKERS = 4 # Reports downloaded at once.
+EXCEL_ENGINES = ("auto", "calamine", "openpyxl_stream", "pandas")
+ACC_SESSION_COOKIES = (".ASPXAUTH", "__RequestVerificationToken") # Required to skip the login.
+ACC_SESSION_MAX_AGE = 8 * 60 * 60 # For cookies without an expiry.
+ACC_SESSION_BLOB = 'monthlies-web-data/session/acc_session.bin'
+ACC_SESSION_KDF_ITERATIONS = 200_000
+ACC_PERIOD_FORMATS = ("%Y-%m", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y/%m", "%m/%Y", "%m/%d/%Y",
+                      "%b %Y", "%B %Y", "%b-%Y", "%b-%y", "%B-%Y", "%b %y") # Month-bearing period headers.
+
+
+class ACCSessionRejected(Exception):
+    '''The site answered with a login page or 401/403.'''
+
+
+def is_acc_response_rejected(response) -> bool:
+    '''JSON endpoints answer HTML (the login page) once the session is gone.'''
+    if response.status_code in (401, 403): return True
+    return "json" not in response.headers.get("Content-Type", "").lower()
+
+
+def read_excel_bytes(xlsx_bytes, engine="auto"):
+    '''
+        First sheet of an xlsx as a DataFrame, header
+        on row 1. engine: "calamine" (python-calamine),
+        "openpyxl_stream" (read-only, rows streamed as
+        values), "pandas" (pd.read_excel default) or
+        "auto" (calamine if installed).
+    '''
+    if engine == "auto": engine = "calamine" if python_calamine is not None else "openpyxl_stream"
+    if engine == "calamine":
+        return pd.read_excel(io.BytesIO(xlsx_bytes), engine="calamine")
+    if engine == "openpyxl_stream":
+        workbook = openpyxl.load_workbook(io.BytesIO(xlsx_bytes), read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None: return pd.DataFrame({})
+            columns = [f"Unnamed: {n}" if col is None else col for n, col in enumerate(header)]
+            return pd.DataFrame.from_records(list(rows), columns=columns)
+        finally:
+            workbook.close()
+    if engine == "pandas":
+        return pd.read_excel(io.BytesIO(xlsx_bytes))
+    raise ValueError(f"Unknown Excel engine '{engine}', expected one of {EXCEL_ENGINES}.")
+
+
+def parse_period_header(header):
+    '''
+        Month of a period column header, or None.
+        Dates from Excel and strings in one of
+        ACC_PERIOD_FORMATS ("2024-06", "Jun 2024",
+        "06/2024", ...) are periods; year-only ("2024"),
+        quarter, total and YTD headers are not.
+    '''
+    if isinstance(header, (datetime.datetime, datetime.date)):
+        return pd.Timestamp(header).date().replace(day=1)
+    text = str(header).strip()
+    for period_format in ACC_PERIOD_FORMATS:
+        try: return datetime.datetime.strptime(text, period_format).date().replace(day=1)
+        except ValueError: continue
+    return None
+
+def normalize_report_to_long(df, report_name):
+    '''
+        Wide ACC report -> long rows
+        (Report, Product, Period, Metric, Value).
+        Period columns are those parse_period_header
+        accepts. Other columns holding text are labels:
+        the first is the product (blank cells from
+        merged ranges are filled down), further ones
+        are joined into the metric. Other numeric
+        columns (totals, quarters, years) are dropped.
+        A report with no period columns returns no rows.
+    '''
+
+    def _is_label(col):
+        values = df[col].dropna()
+        return len(values) > 0 and pd.to_numeric(values, errors="coerce").isna().any()
+
+    columns = ["Report", "Product", "Period", "Metric", "Value"]
+    periods = [parse_period_header(header) for header in df.columns]
+    if all(period is None for period in periods): return pd.DataFrame({col: [] for col in columns})
+    period_cols = [col for col, period in zip(df.columns, periods) if period is not None]
+    id_cols = [col for col, period in zip(df.columns, periods) if period is None and _is_label(col)]
+    dropped = [str(col) for col, period in zip(df.columns, periods) if period is None and col not in id_cols]
+    if dropped: logging.info(f"{report_name}: dropped non-period columns {dropped}.")
+    if not id_cols: return pd.DataFrame({col: [] for col in columns})
+
+    df = df.copy()
+    df[id_cols[0]] = df[id_cols[0]].ffill()
+    product = df[id_cols[0]].astype("string").str.strip()
+    if len(id_cols) > 1:
+        metric = df[id_cols[1]].astype("string").fillna("").str.strip().str.cat(
+            [df[col].astype("string").fillna("").str.strip() for col in id_cols[2:]], sep=" | ")
+    else: metric = pd.Series("Value", index=df.index, dtype="string")
+    df_wide = pd.concat([product.rename("Product"), metric.rename("Metric"),
+                         df.iloc[:, [i for i, period in enumerate(periods) if period is not None]].set_axis(range(len(period_cols)), axis=1)], axis=1)
+
+    df_long = df_wide.melt(id_vars=["Product", "Metric"], var_name="Period", value_name="Value")
+    df_long["Value"] = pd.to_numeric(df_long["Value"], errors="coerce")
+    df_long["Period"] = df_long["Period"].map(dict(enumerate(period for period in periods if period is not None)))
+    df_long["Report"] = report_name
+    df_long = df_long[df_long["Value"].notna() & df_long["Product"].notna()]
+    n_duplicates = df_long.duplicated(subset=["Report", "Product", "Period", "Metric"]).sum()
+    if n_duplicates: logging.warning(f"{report_name}: {n_duplicates} repeated Product/Period/Metric rows; keeping the last.")
+    return df_long.drop_duplicates(subset=["Report", "Product", "Period", "Metric"], keep="last")[columns].reset_index(drop=True)
+
+
+def to_typed_parquet_bytes(df):
+    '''
+        Parquet bytes with concrete column types:
+        object columns that are fully numeric become
+        float/int, the rest nullable strings; column
+        names are strings.
+    '''
+    df = df.copy()
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns:
+        if df[col].dtype != object: continue
+        numeric = pd.to_numeric(df[col], errors="coerce")
+        if numeric.notna().sum() == df[col].notna().sum(): df[col] = numeric
+        else: df[col] = df[col].astype("string")
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
 
 class acc():
 
@@ -23,6 +167,10 @@ class acc():
                 storage_account_key_for_synapse = data["Values"]["ADLS_STORAGEACCOUNTKEY_FORSYNAPSE"]
                 storage_account_name_for_synapse = data["Values"]["ADLS_STORAGEACCOUNTNAME_FORSYNAPSE"]
                 b_is_local = data["Values"]["IS_RUNNING_LOCALLY"]
+                b_archive_xlsx = data["Values"].get("ACC_ARCHIVE_XLSX", False)
+                excel_engine = data["Values"].get("ACC_EXCEL_ENGINE", "auto")
+                b_load_synapse = data["Values"].get("ACC_LOAD_SYNAPSE", False)
+                host = data["Values"].get("SYNAPSE_INSTANCE")
         except FileNotFoundError or FileNotFoundError or KeyError:
             kv_env = os.environ["KEYVAULT_ENV"]
             acc_login_url = os.environ["ACC_LOGIN_URL"]
@@ -31,6 +179,10 @@ class acc():
             storage_account_key_for_synapse = os.environ["ADLS_STORAGEACCOUNTKEY_FORSYNAPSE"]
             storage_account_name_for_synapse = os.environ["ADLS_STORAGEACCOUNTNAME_FORSYNAPSE"]
             b_is_local = os.environ["IS_RUNNING_LOCALLY"]
+            b_archive_xlsx = os.environ.get("ACC_ARCHIVE_XLSX", False)
+            excel_engine = os.environ.get("ACC_EXCEL_ENGINE", "auto")
+            b_load_synapse = os.environ.get("ACC_LOAD_SYNAPSE", False)
+            host = os.environ.get("SYNAPSE_INSTANCE")
 
         if b_is_local == True:
             az_credential = azure.identity.AzureCliCredential()
@@ -51,8 +203,13 @@ class acc():
         self.storage_account_name_for_synapse = storage_account_name_for_synapse
         self.storage_account_key_for_synapse = storage_account_key_for_synapse
         self.is_local = b_is_local
+        self.b_archive_xlsx = str(b_archive_xlsx).lower() in ("true", "1") # Also keep raw xlsx under ACC/xlsx/.
+        self.excel_engine = excel_engine # See EXCEL_ENGINES.
+        self.b_load_synapse = str(b_load_synapse).lower() in ("true", "1") # Also load stg.ACCReports.
+        self.host = host
 
     def read_from_blob(self, where_from, what='json'):
+        '''what: 'json' (parsed) or 'bytes' (raw).'''
         container_name = 'rti-synapse-db'
         blob_service_client = BlobServiceClient(
             account_url=f"https://{self.storage_account_name_for_synapse}.blob.core.windows.net",
@@ -60,6 +217,7 @@ class acc():
         container_client = blob_service_client.get_container_client(container_name)
         blob_client = container_client.get_blob_client(where_from)
         blob_data = blob_client.download_blob().readall()
+        if what == 'bytes': return blob_data
         return json.loads(blob_data)
 
     def write_to_blob(self, where_to_write, what_to_write):
@@ -71,6 +229,90 @@ class acc():
         blob_client = container_client.get_blob_client(where_to_write)
         blob_client.upload_blob(what_to_write, overwrite=True)
 
+    def _get_session_cipher(self):
+        '''Fernet key derived from the ACC credentials (PBKDF2-SHA256).'''
+        salt = hashlib.sha256(f"acc-session:{self.username.value}".encode("utf-8")).digest()[:16]
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=ACC_SESSION_KDF_ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(kdf.derive(self.password.value.encode("utf-8"))))
+
+    def _get_session_file(self):
+        return os.path.join(tempfile.gettempdir(), "acc_session.bin")
+
+    def load_session_cookies(self, session) -> bool:
+        '''
+            Restores saved cookies into session. False if
+            none are stored, they cannot be decrypted, or
+            a required cookie has expired.
+        '''
+        try:
+            if self.is_local == True:
+                with open(self._get_session_file(), "rb") as f: token = f.read()
+            else:
+                token = self.read_from_blob(ACC_SESSION_BLOB, 'bytes')
+        except (FileNotFoundError, ResourceNotFoundError):
+            return False
+        try:
+            cookies = json.loads(self._get_session_cipher().decrypt(token))
+        except (InvalidToken, ValueError):
+            print("Stored ACC session could not be decrypted.")
+            return False
+
+        now = time.time()
+        live_cookies = [cookie for cookie in cookies if cookie["expires"] > now]
+        if not set(ACC_SESSION_COOKIES) <= {cookie["name"] for cookie in live_cookies}:
+            print("Stored ACC session expired.")
+            return False
+        for cookie in live_cookies:
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+        return True
+
+    def save_session_cookies(self, session):
+        '''Encrypts the session cookies, with expiry, to local disk or blob.'''
+        default_expires = time.time() + ACC_SESSION_MAX_AGE
+        cookies = [{"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path,
+                    "expires": min(cookie.expires or default_expires, default_expires)} for cookie in session.cookies]
+        token = self._get_session_cipher().encrypt(json.dumps(cookies).encode("utf-8"))
+        if self.is_local == True:
+            with open(self._get_session_file(), "wb") as f: f.write(token)
+        else:
+            self.write_to_blob(ACC_SESSION_BLOB, token)
+
+    def upload_acc_long_data(self, host, df):
+        '''
+            Replaces the rows of the loaded reports in
+            stg.ACCReports with one parameterized
+            executemany batch.
+        '''
+
+        def _exec_bulk_upsert(az_syn, df, tbl):
+            df = df.assign(LastUpdated=datetime.datetime.now().replace(microsecond=0))
+            records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+            reports = sorted(df["Report"].unique())
+
+            Session = sessionmaker(az_syn.engine)
+            with Session() as session:
+                # Keyed clear, then one batch insert:
+                sql_del = sa.delete(tbl).where(tbl.report.in_(reports))
+                logging.info(f"{sql_del} -- reports: {reports}")
+                session.execute(sql_del)
+                session.execute(sa.insert(tbl.__table__), records) # Column-name keys.
+                logging.info(f"Inserted {len(records)} rows into {tbl.__table__.fullname}.")
+                # session.commit() # Set to autocommit for Az Syn.
+                session.close()
+
+        if df.empty: return
+
+        # ODBC General authentication:
+        driver = "{ODBC Driver 18 for SQL Server}"
+        port = 1433
+        database = "synapsesqlserver"
+        timeout = "30"
+
+        az_syn = azsyn.AzureSynapseInstance(driver=driver, host=host, port=port, database=database, timeout=timeout)
+        tbl_stg_ACCReports = az_syn.get_tbl_stg_ACCReports()
+        _exec_bulk_upsert(az_syn, df, tbl_stg_ACCReports)
+        az_syn.dispose()
+
     def convert_period_date(self, period_date):
         # Extract the timestamp (milliseconds since epoch)
         timestamp = int(period_date[6:-2])
@@ -94,7 +336,15 @@ class acc():
 
         return url_encoded_date
 
-    def get_payloads4(self):
+    def get_payloads4(self, data_text=None):
+        '''
+            Points queries.json and payloads.json at the
+            latest reporting period in data.json. The
+            manifests are read concurrently (data_text,
+            if given, replaces the data.json read), matched
+            through handle-keyed dicts, and written back
+            only if changed. Returns the payloads list.
+        '''
         reports = [
             'PE Inventory - US',
             'PE Capacity',
@@ -118,139 +368,174 @@ class acc():
             'PVC Capacity',
         ]
         
-        blob_name = 'monthlies-web-data/json/data.json'
-        data=self.read_from_blob(blob_name, 'json')
-        
-        # Filter data
-        filtered_data = {"Data": [item for item in data['Data'] if item.get('FullProductName') in reports]}
-
-        # Convert PeriodDate
-        for item in filtered_data["Data"]:
+        def _first_words(name, sep=None):
+            '''Handle: first two words, e.g. "HDPE Preliminary".'''
+            return (sep or " ").join(name.split(sep)[:2])
+
+        def _lookup(index, records, handle, key):
+            '''Exact handle first; substring scan as the fallback.'''
+            if handle in index: return index[handle]
+            return next((record for record in records if handle in record[key]), None)
+
+        def _write_if_changed(blob_name, before_json, records):
+            records_json = json.dumps(records)
+            if records_json != before_json:
+                self.write_to_blob(blob_name, records_json)
+                print(f"Updated {blob_name}.")
+            else: print(f"Unchanged {blob_name}.")
+            return records_json
+
+        data_blob_name = 'monthlies-web-data/json/data.json'
+        queries_blob_name = 'monthlies-web-data/json/queries.json'
+        payloads_blob_name = 'monthlies-web-data/json/payloads.json'
+
+        # Read manifests concurrently:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            data_future = executor.submit(self.read_from_blob, data_blob_name, 'json') if data_text is None else None
+            queries_future = executor.submit(self.read_from_blob, queries_blob_name, 'json')
+            payloads_future = executor.submit(self.read_from_blob, payloads_blob_name, 'json')
+            data = json.loads(data_text) if data_text is not None else data_future.result()
+            queries_list = queries_future.result()
+            payloads_list = payloads_future.result()
+        queries_before = json.dumps(queries_list)
+        payloads_before = json.dumps(payloads_list)
+
+        # Filter data, index by handle (first two words), first match wins:
+        report_set = set(reports)
+        filtered_data = [item for item in data['Data'] if item.get('FullProductName') in report_set]
+        data_index = {}
+        for item in filtered_data:
             item["PeriodDate"] = self.convert_period_date(item["PeriodDate"])
-
-        # Get queries
-        blob_name = 'monthlies-web-data/json/queries.json'
-        queries_list= self.read_from_blob(blob_name, 'json')
+            data_index.setdefault(_first_words(item["FullProductName"]), item)
 
         # Update queries with formatted names
         for item in queries_list:
             name = item["Name"].replace("-", " ").replace(" US", " - US")
-            # print(name)
-            handle = name.split()
-            handle = " ".join(handle[:2])
-            # print(handle)
-            
-            for i in filtered_data["Data"]:
-                if handle in i["FullProductName"]:
-                    item["PeriodDate"] = i["PeriodDate"]
-                    item["Name"] = f"{handle} {i['ReportingPeriod']} Industry Report"
-                    mylist= item["Name"].split()
-                    item["Name"] = '-'.join(mylist)
-                    # print(item["Name"])
-                    item["PeriodDate"] = i["PeriodDate"]
-                    # print(item["PeriodDate"])
-                    break
-
-        queries_json = json.dumps(queries_list)
-
-        # Write queries
-        blob_name = 'monthlies-web-data/json/queries.json'
-        self.write_to_blob(blob_name, queries_json)
-
-        # Get old payloads
-        blob_name = 'monthlies-web-data/json/payloads.json'
-        payloads_list = self.read_from_blob(blob_name, 'json')
-        print(f"{payloads_list}")
+            handle = _first_words(name)
+            i = _lookup(data_index, filtered_data, handle, "FullProductName")
+            if i is not None:
+                item["PeriodDate"] = i["PeriodDate"]
+                item["Name"] = '-'.join(f"{handle} {i['ReportingPeriod']} Industry Report".split())
+
+        _write_if_changed(queries_blob_name, queries_before, queries_list)
 
         # Update payloads with query strings
+        queries_index = {}
+        for i in queries_list:
+            queries_index.setdefault(_first_words(i["Name"], sep="-"), i)
         for item in payloads_list:
             name = item["name"].replace("-", " ").replace(" US", "-US").replace("-US", " - US")
-            handle = name.split()
-            handle = "-".join(handle[:2])
-            # print(handle)
-
-            for i in queries_list:
-                if handle in i["Name"]:
-                    item["name"] = i["Name"]
-                    item['queries'] = (
-                        f"{i.get('Start', '')}CompanyId={i.get('CompanyId', '')}&"
-                        f"FrequencyId={i.get('FrequencyId', '')}&"
-                        f"Name={i.get('Name', '')}&"
-                        f"PeriodDate={i.get('PeriodDate', '')}&"
-                        f"ProductId={i.get('ProductId', '')}&"
-                        f"ProductName={i.get('ProductName', '')}"
-                    )
-                    break
-        payloads_json = json.dumps(payloads_list)
-        self.write_to_blob(blob_name, payloads_json)
-        print(payloads_json)
+            handle = "-".join(name.split()[:2])
+            i = _lookup(queries_index, queries_list, handle, "Name")
+            if i is not None:
+                item["name"] = i["Name"]
+                item['queries'] = (
+                    f"{i.get('Start', '')}CompanyId={i.get('CompanyId', '')}&"
+                    f"FrequencyId={i.get('FrequencyId', '')}&"
+                    f"Name={i.get('Name', '')}&"
+                    f"PeriodDate={i.get('PeriodDate', '')}&"
+                    f"ProductId={i.get('ProductId', '')}&"
+                    f"ProductName={i.get('ProductName', '')}"
+                )
+
+        _write_if_changed(payloads_blob_name, payloads_before, payloads_list)
+        print(f"{len(filtered_data)} reports, {len(queries_list)} queries, {len(payloads_list)} payloads.")
+        return payloads_list
     
     def execute_acc(self):
-        with requests.Session() as session:
-            # Initial GET request to fetch the login page
-            response = session.get(self.login_url)
-
-        # Parse response for the CSRF token from the form
-        soup = BeautifulSoup(response.content, 'html.parser')
-        request_verification_token = soup.find('input', {'name': '__RequestVerificationToken'}).get('value')
-
-        # Extract cookies
-        header_request_token = response.cookies.get('__RequestVerificationToken')
-        
-        # Construct headers for the POST request to login
-        login_headers = {
-            "Cache-Control": "max-age=0",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Cookie": f"__RequestVerificationToken={header_request_token}",
-            "Origin": "https://pips.vaultconsulting.com",
-            "Referer": self.login_url,
-            "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Mobile Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
-        }
-        
-        # Prepare data payload for login
-        data = {
-            "__RequestVerificationToken": request_verification_token,
-            "Item.Username": self.username.value,
-            "Item.Password": self.password.value
-        }
 
-        # POST request to login
-        session.post(self.login_url, headers=login_headers, data=data)
+        def _login():
+            '''
+                Login page -> CSRF token -> credentials POST;
+                the resulting cookies are saved for reuse.
+            '''
+            session.cookies.clear()
 
-        # Extract the ASPXAUTH cookie after login
-        ASPXAUTH = session.cookies.get('.ASPXAUTH')
+            # Initial GET request to fetch the login page
+            response = session.get(self.login_url)
 
-        # Headers for subsequent requests
-        headers = {
-            "authority": "pips.vaultconsulting.com",
-            "method": "GET",
-            "path": "/reports",
-            "scheme": "https",
-            "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "accept-encoding": "gzip, deflate, br, zstd",
-            "accept-language": "en-US,en;q=0.9,uz;q=0.8",
-            "cookie": f"__RequestVerificationToken={header_request_token}; .ASPXAUTH={ASPXAUTH}; app.context-company=10121; app.filter-company=10121",
-            "priority": "u=0, i",
-            "referer": "https://pips.vaultconsulting.com/",
-            "sec-ch-ua": '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
-            "sec-ch-ua-mobile": "?1",
-            "sec-ch-ua-platform": '"Android"',
-            "sec-fetch-dest": "document",
-            "sec-fetch-mode": "navigate",
-            "sec-fetch-site": "same-origin",
-            "sec-fetch-user": "?1",
-            "upgrade-insecure-requests": "1",
-            "user-agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Mobile Safari/537.36"
-        }
+            # Parse response for the CSRF token from the form
+            soup = BeautifulSoup(response.content, 'html.parser')
+            request_verification_token = soup.find('input', {'name': '__RequestVerificationToken'}).get('value')
 
-        # POST request to retrieve report data (data_json equivalent from previous step)
-        response = session.post("https://pips.vaultconsulting.com/reports/myreports_read", headers=headers)
+            # Extract cookies
+            header_request_token = response.cookies.get('__RequestVerificationToken')
+            
+            # Construct headers for the POST request to login
+            login_headers = {
+                "Cache-Control": "max-age=0",
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Cookie": f"__RequestVerificationToken={header_request_token}",
+                "Origin": "https://pips.vaultconsulting.com",
+                "Referer": self.login_url,
+                "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Mobile Safari/537.36",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
+            }
+            
+            # Prepare data payload for login
+            data = {
+                "__RequestVerificationToken": request_verification_token,
+                "Item.Username": self.username.value,
+                "Item.Password": self.password.value
+            }
+
+            # POST request to login
+            session.post(self.login_url, headers=login_headers, data=data)
+            self.save_session_cookies(session)
+            print("Logged in to ACC.")
+
+        def _read_reports():
+            '''POST for the report listing (data.json); headers carry the session cookies.'''
+            header_request_token = session.cookies.get('__RequestVerificationToken')
+            ASPXAUTH = session.cookies.get('.ASPXAUTH')
+
+            # Headers for subsequent requests
+            headers = {
+                "authority": "pips.vaultconsulting.com",
+                "method": "GET",
+                "path": "/reports",
+                "scheme": "https",
+                "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+                "accept-encoding": "gzip, deflate, br, zstd",
+                "accept-language": "en-US,en;q=0.9,uz;q=0.8",
+                "cookie": f"__RequestVerificationToken={header_request_token}; .ASPXAUTH={ASPXAUTH}; app.context-company=10121; app.filter-company=10121",
+                "priority": "u=0, i",
+                "referer": "https://pips.vaultconsulting.com/",
+                "sec-ch-ua": '"Not)A;Brand";v="99", "Google Chrome";v="127", "Chromium";v="127"',
+                "sec-ch-ua-mobile": "?1",
+                "sec-ch-ua-platform": '"Android"',
+                "sec-fetch-dest": "document",
+                "sec-fetch-mode": "navigate",
+                "sec-fetch-site": "same-origin",
+                "sec-fetch-user": "?1",
+                "upgrade-insecure-requests": "1",
+                "user-agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Mobile Safari/537.36"
+            }
+
+            # POST request to retrieve report data (data_json equivalent from previous step)
+            return session.post(ACC_REPORTS_URL, headers=headers)
+
+        # Enter: reuse the saved session, log in only if it is missing or rejected.
+        session = requests.Session()
+        # The listing is cached on disk; cookies are not part of the key. Login pages are never stored.
+        cache = http_cache.CachingAdapter(name="acc", ttl=ACC_CACHE_TTL, cache_post=True,
+                                          store_if=lambda response: not is_acc_response_rejected(response))
+        session.mount(ACC_REPORTS_URL, cache)
+
+        b_reused = self.load_session_cookies(session)
+        if b_reused: print("Reusing stored ACC session.")
+        else: _login()
+        response = _read_reports()
+        if is_acc_response_rejected(response) and b_reused:
+            print("Stored ACC session rejected; logging in again.")
+            _login()
+            response = _read_reports()
         text = response.text
+        cache.log_stats()
         
         blob_name = 'monthlies-web-data/json/data.json'
         self.write_to_blob(blob_name, text)
-        self.get_payloads4() # Execute, is there any purpose to this?
+        payloads = self.get_payloads4(data_text=text) # Refreshes queries.json/payloads.json for the latest period.
         
         # After login, send POST request to download URL
         download_headers = {
@@ -270,14 +555,6 @@ class acc():
             "x-requested-with": "XMLHttpRequest"
         }
 
-        cookies = {
-            '__RequestVerificationToken': header_request_token,
-        }
-
-        # %run Scrape Monthlies Data/read_from_blob
-        blob_name = 'monthlies-web-data/json/payloads.json'
-        payloads = self.read_from_blob(blob_name,'json')
-
         # Azure Blob Storage credentials
         container_name = 'rti-synapse-db'
         directory_name = 'ACC'
@@ -285,10 +562,27 @@ class acc():
         blob_service_client = BlobServiceClient(account_url=account_url, credential=self.storage_account_key_for_synapse)
         container_client = blob_service_client.get_container_client(container_name)
 
-        for item in payloads:
-            
+        def _get_worker_session():
+            '''One session per pool thread, carrying the login cookies.'''
+            if not hasattr(thread_local, "session"):
+                worker_session = requests.Session()
+                worker_session.headers.update(session.headers)
+                worker_session.cookies.update(session.cookies)
+                thread_local.session = worker_session
+            return thread_local.session
+
+        def _download_and_upload_report(item):
+            '''
+                Download URL -> xlsx bytes -> DataFrame ->
+                CSV and Parquet buffers -> blob, all in
+                memory. The raw xlsx is archived in parallel
+                if enabled.
+            '''
+            worker_session = _get_worker_session()
+
             # Send POST request to download the report
-            download_response = session.post(self.download_url, headers=download_headers, cookies=cookies, json=item)
+            download_response = worker_session.post(self.download_url, headers=download_headers, cookies=cookies, json=item)
+            if is_acc_response_rejected(download_response): raise ACCSessionRejected(item['name'])
             
             # Parse the JSON response to extract the actual download URL
             response_data = download_response.json()
@@ -298,39 +592,58 @@ class acc():
             full_download_url = f"https://pips.vaultconsulting.com{file_download_url}"
             
             # download the file from the extracted URL
-            file_response = session.get(full_download_url, cookies=cookies)
+            file_response = worker_session.get(full_download_url, cookies=cookies)
+            if file_response.status_code in (401, 403): raise ACCSessionRejected(item['name'])
+            xlsx_bytes = file_response.content
 
-            # Define the blob name including the directory
-            excel_blob_name = f"{directory_name}/output.xlsx"
-            blob_client = container_client.get_blob_client(excel_blob_name)
-            
-            # Assuming `file_response.content` contains the bytes of the Excel file
-            blob_client.upload_blob(file_response.content, overwrite=True)
-            
-            # Download the Excel file from Blob Storage
-            with tempfile.NamedTemporaryFile(prefix="acc_scrape_output", suffix=".xlsx", mode='a', delete=False) as temp_file:
-                temp_file_name = temp_file.name
-            with open(temp_file_name , 'wb') as file:
-                download_stream = blob_client.download_blob()
-                file.write(download_stream.readall())
-
-            # Read the Excel file into a DataFrame
-            df = pd.read_excel(temp_file_name)
-            # print(df)
-            # Construct the CSV file name based on item['name']
-            csv_filename = f"{item['name']}"
-            with tempfile.NamedTemporaryFile(prefix=csv_filename, suffix=".csv", mode='a', delete=False) as temp_file:
-                tempcsv_file_name = temp_file.name
+            # Optional raw archive, uploaded while the report is parsed:
+            archive_future = None
+            if self.b_archive_xlsx:
+                excel_blob_client = container_client.get_blob_client(f"{directory_name}/xlsx/{item['name']}.xlsx")
+                archive_future = archive_executor.submit(excel_blob_client.upload_blob, xlsx_bytes, overwrite=True)
 
-            # Save the DataFrame as a CSV file locally
-            df.to_csv(tempcsv_file_name, index=False)
+            # Read the Excel bytes into a DataFrame
+            df = read_excel_bytes(xlsx_bytes, engine=self.excel_engine)
 
-            # Upload the CSV file to the specified directory in Blob Storage
+            # CSV into a buffer, uploaded under the report name
+            csv_filename = f"{item['name']}"
+            csv_buffer = io.StringIO()
+            df.to_csv(csv_buffer, index=False)
             csv_blob_name = f"{directory_name}/{csv_filename}"
             csv_blob_client = container_client.get_blob_client(csv_blob_name)
-
-            with open(tempcsv_file_name, "rb") as data:
-                csv_blob_client.upload_blob(data, overwrite=True)
+            csv_blob_client.upload_blob(csv_buffer.getvalue().encode("utf-8"), overwrite=True)
+
+            # Typed Parquet next to the CSV
+            parquet_blob_client = container_client.get_blob_client(f"{csv_blob_name}.parquet")
+            parquet_blob_client.upload_blob(to_typed_parquet_bytes(df), overwrite=True)
+
+            # Long rows for stg.ACCReports, loaded once after the pool:
+            df_long = normalize_report_to_long(df, csv_filename) if self.b_load_synapse else None
+
+            if archive_future is not None: archive_future.result()
+            print(f"Report uploaded: {csv_blob_name}")
+            return csv_blob_name, df_long
+
+        # Reports on a bounded pool; one fresh login if the session is rejected midway:
+        n_workers = max(1, min(ACC_MAX_WORKERS, len(payloads)))
+        for attempt in range(2):
+            cookies = {'__RequestVerificationToken': session.cookies.get('__RequestVerificationToken')}
+            thread_local = threading.local()
+            try:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor, ThreadPoolExecutor(max_workers=n_workers) as archive_executor:
+                    results = list(executor.map(_download_and_upload_report, payloads))
+                break
+            except ACCSessionRejected as e:
+                if attempt == 1: raise
+                print(f"ACC session rejected at '{e}'; logging in again.")
+                _login()
+        print(f"{len(results)} ACC reports uploaded with {n_workers} workers.")
+
+        # Optional: every report's long rows in one batch.
+        if self.b_load_synapse:
+            df_long = pd.concat([df_long for _, df_long in results], ignore_index=True)
+            print(f"Loading {len(df_long)} rows from {df_long['Report'].nunique()} reports into stg.ACCReports.")
+            self.upload_acc_long_data(self.host, df_long)
     
     def main_acc(self): 
         self.execute_acc()
@@ -0,0 +1,72 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-03
+# Notes: Benchmarks CME price normalization
+# (clean_df) on wide, many-row frames against
+# the previous per-column regex implementation.
+# Run from the project root:
+#   python -m cme.bench.bench_clean_df --rows 200000 --cols 10
+####################################
+
+import argparse, time
+import pandas as pd, numpy as np
+import cme.src.pull_cme_data as pull_cme
+
+
+def build_frame(n_rows, n_cols, seed=0):
+    '''
+        Synthetic CME-notation frame: status
+        letters, leading dots, blanks and dashes.
+    '''
+    rng = np.random.default_rng(seed)
+    frame = {"DATA_SET": np.repeat(pull_cme.NG_HENRY_HUB_NATURAL_GAS_FUTURES, n_rows),
+             "MTH_STRIKE": np.repeat("JAN25", n_rows)}
+    for n in range(n_cols):
+        prices = rng.uniform(0.0, 120.0, n_rows).round(3).astype(str)
+        prices = np.where(prices.astype(float) < 1.0, np.char.lstrip(prices, "0"), prices)
+        suffix = rng.choice(["", "", "", "A", "B"], n_rows)
+        col = np.char.add(prices, suffix).astype(object)
+        col[rng.random(n_rows) < 0.05] = ""
+        col[rng.random(n_rows) < 0.02] = "----"
+        frame[f"PRICE_{n}"] = col
+    return pd.DataFrame(frame)
+
+def legacy_clean_df(df, columns_to_keep):
+    df = df[columns_to_keep]
+    df = df.astype(str)
+    for col in df.columns:
+        if col not in ["MTH_STRIKE", "DATA_SET"]:
+            df[col] = df[col].str.replace(r'^\.', '0.', regex=True)
+            df[col] = df[col].str.extract(r'(\d+\.?\d*)', expand=False).astype(float)
+    return df
+
+def time_call(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+def main(n_rows, n_cols, repeat):
+    df = build_frame(n_rows, n_cols)
+    columns = df.columns.to_list()
+    cme = pull_cme.CMEDatamineAPI()
+
+    t_legacy, df_legacy = time_call(legacy_clean_df, df, columns, repeat=repeat)
+    t_vector, df_vector = time_call(cme.clean_df, df, columns, repeat=repeat)
+
+    price_cols = columns[2:]
+    b_match = np.allclose(df_legacy[price_cols].to_numpy(float), df_vector[price_cols].to_numpy(float), equal_nan=True)
+    print(f"rows={n_rows} cols={n_cols} cells={n_rows*n_cols}")
+    print(f"legacy clean_df:     {t_legacy:8.3f} s")
+    print(f"vectorized clean_df: {t_vector:8.3f} s ({t_legacy/t_vector:.1f}x)")
+    print(f"results match: {b_match}")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    arg_parser.add_argument("--cols", type=int, default=10)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+    main(args.rows, args.cols, args.repeat)
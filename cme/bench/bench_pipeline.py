@@ -0,0 +1,121 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-05
+# Notes: Offline benchmark of the CME parsing
+# pipeline on synthetic settlement files:
+#   get_dfs_from_fid_dict -> clean_df ->
+#   transform_df_for_azure_upsert
+# Reports wall time, peak memory and MB/s per
+# stage. Each run is appended to
+# cme/bench/results/bench_pipeline.jsonl and
+# compared with the last run of the same size.
+# Run from the project root:
+#   python -m cme.bench.bench_pipeline --products 50 --months 120
+# --layout picks the heading layout (single, spaced,
+# nymex; see synthetic_settlements).
+####################################
+
+import os, json, argparse, time, tracemalloc
+import pathlib as path
+import datetime, tempfile, subprocess
+import cme.src.pull_cme_data as pull_cme
+try: import cme.bench.synthetic_settlements as synth
+except ModuleNotFoundError: import synthetic_settlements as synth
+
+RESULTS_FILE = path.Path(__file__).parent / "results" / "bench_pipeline.jsonl"
+
+
+class OfflineCMEDatamineAPI(pull_cme.CMEDatamineAPI):
+    '''Serves a local settlement file instead of calling Datamine.'''
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+
+    def download_and_get_file(self, fid, date=None):
+        return self.file_path
+
+
+def _measure(fn, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, wall, peak
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=path.Path(__file__).parent).stdout.strip()
+    except Exception: return ""
+
+def run_pipeline(file_path, products):
+    cme = OfflineCMEDatamineAPI(file_path)
+    stages = {}
+    dict_dfs, stages["get_dfs_from_fid_dict"], peak_parse = _measure(cme.get_dfs_from_fid_dict, {"SYNTHETIC": products})
+    df = cme.concat_dfs_into_sum_df(dict_dfs)
+    df, stages["clean_df"], peak_clean = _measure(cme.clean_df, df, ["DATA_SET", "MTH_STRIKE", "SETT", "DAILY_LAST"])
+    df.rename(columns={"DATA_SET":"Data_Set", "MTH_STRIKE":"Month", "SETT":"Settlement_Price", "DAILY_LAST":"Last_Price"}, inplace=True)
+    _, stages["transform_df_for_azure_upsert"], peak_transform = _measure(cme.transform_df_for_azure_upsert, df)
+    return stages, max(peak_parse, peak_clean, peak_transform), len(df)
+
+def load_previous(params):
+    if not RESULTS_FILE.exists(): return None
+    previous = None
+    with open(RESULTS_FILE, "r") as f:
+        for line in f:
+            result = json.loads(line)
+            if result["params"] == params: previous = result
+    return previous
+
+def save_result(result):
+    os.makedirs(RESULTS_FILE.parent, exist_ok=True)
+    with open(RESULTS_FILE, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+def main(n_products, n_months, repeat, seed, layout="single"):
+    params = {"products": n_products, "months": n_months, "seed": seed, "layout": layout}
+    with tempfile.NamedTemporaryFile(prefix="cme_synthetic_", suffix=".txt", delete=False) as temp_file:
+        file_path = temp_file.name
+    file_path, products, size_bytes = synth.generate_settlement_file(file_path, n_products, n_months, seed, layout=layout)
+
+    runs = [run_pipeline(file_path, products) for _ in range(repeat)]
+    os.remove(file_path)
+    stages = {k: min(run[0][k] for run in runs) for k in runs[0][0]}
+    total = sum(stages.values())
+    result = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "params": params,
+        "rows": runs[0][2],
+        "size_mb": size_bytes / 1e6,
+        "stages_s": stages,
+        "total_s": total,
+        "peak_mb": max(run[1] for run in runs) / 1e6,
+        "mb_per_s": (size_bytes / 1e6) / total,
+    }
+
+    previous = load_previous(params)
+    print(f"products={n_products} months={n_months} rows={result['rows']} file={result['size_mb']:.2f} MB")
+    for stage, wall in stages.items():
+        delta = ""
+        if previous is not None and previous["stages_s"].get(stage):
+            delta = f" ({(wall/previous['stages_s'][stage]-1)*100:+.1f}% vs {previous['revision'] or previous['timestamp']})"
+        print(f"  {stage:32s} {wall:8.3f} s{delta}")
+    print(f"  {'total':32s} {total:8.3f} s, {result['mb_per_s']:.2f} MB/s, peak {result['peak_mb']:.1f} MB")
+    if previous is not None:
+        print(f"  previous total {previous['total_s']:.3f} s, {previous['mb_per_s']:.2f} MB/s, peak {previous['peak_mb']:.1f} MB")
+    save_result(result)
+    return result
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--products", type=int, default=20)
+    arg_parser.add_argument("--months", type=int, default=60)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--layout", default="single", choices=list(synth.HEADINGS))
+    args = arg_parser.parse_args()
+    main(args.products, args.months, args.repeat, args.seed, args.layout)
@@ -0,0 +1,99 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-05
+# Notes: Writes synthetic CME settlement files in
+# the Datamine fixed-width layout read by
+# CMEDatamineAPI.get_dfs_from_fid_dict: a heading
+# line, then per product a title line, one row per
+# contract month and a TOTAL footer. Prices carry
+# A/B status letters, leading dots and blank
+# fields like the real files. Heading layouts:
+# "single" (one token per column), "spaced" (names
+# with spaces, e.g. "PRIOR SETT") and "nymex" (two
+# stacked lines under dashed DAILY / PRIOR DAY
+# banners).
+####################################
+
+import datetime
+import numpy as np
+import cme.src.pull_cme_data as pull_cme
+
+HEADINGS = {
+    "single": [["MTH/STRIKE", "OPEN", "HIGH", "LOW", "LAST", "SETT", "PT.CHGE", "EST.VOL", "PRIORSETT", "PRIORVOL", "PRIORINT"]],
+    "spaced": [["MTH/STRIKE", "OPEN", "HIGH", "LOW", "LAST", "SETT", "PT. CHGE", "EST. VOL", "PRIOR SETT", "PRIOR VOL", "PRIOR INT"]],
+    "nymex": [["MTH/", "", "", "", "", "", "PT.", "EST.", "", "", ""],
+              ["STRIKE", "OPEN", "HIGH", "LOW", "LAST", "SETT", "CHGE", "VOL", "SETT", "VOL", "INT"]],
+}
+BANNERS = {"nymex": [("DAILY", 1, 4), ("PRIOR DAY", 8, 10)]} # (text, first column, last column)
+FIELD_WIDTH = 10
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+
+def get_product_names(n_products):
+    '''Real data sets first, then synthetic ones.'''
+    products = list(pull_cme.CME_INSTRUMENT_MAP.keys())[:n_products]
+    products += [f"Z{n} Synthetic Product {n} Futures" for n in range(len(products), n_products)]
+    return products
+
+def _get_widths(layout):
+    '''Field widths: the first fits its heading, the rest at least FIELD_WIDTH.'''
+    longest = [max(len(line[i]) for line in HEADINGS[layout]) for i in range(len(HEADINGS[layout][0]))]
+    return [longest[0]] + [max(FIELD_WIDTH, n + 2) for n in longest[1:]]
+
+def _format_row(cells, widths):
+    '''First cell left-aligned, the rest right-aligned under the heading.'''
+    row = cells[0].ljust(widths[0])
+    for width, cell in zip(widths[1:], cells[1:]):
+        row += cell.rjust(width)
+    return row
+
+def _format_heading(layout, widths):
+    lines = [_format_row(line, widths) for line in HEADINGS[layout]]
+    starts = [sum(widths[:i]) for i in range(len(widths) + 1)]
+    for text, first, last in BANNERS.get(layout, []):
+        banner = f" {text} ".center(starts[last+1] - starts[first] - 2, "-")
+        lines[0] = lines[0][:starts[first]+2] + banner + lines[0][starts[last+1]:]
+    return [line.rstrip() for line in lines]
+
+def _format_price(value, rng):
+    price = f"{value:.3f}"
+    if value < 1.0: price = price[1:] # ".771"
+    status = rng.choice(["", "", "", "A", "B"])
+    # Status letter sits one past the right edge, like Datamine.
+    return price + status if status else price + " "
+
+def generate_settlement_file(file_path, n_products=7, n_months=24, seed=0, business_date=None, layout="single"):
+    '''
+        Writes the file and returns
+        (file_path, product_names, size_bytes).
+    '''
+    rng = np.random.default_rng(seed)
+    widths = _get_widths(layout)
+    if business_date is None: business_date = datetime.date.today()
+    products = get_product_names(n_products)
+
+    lines = [f"BUSINESS DATE: {business_date.strftime('%m/%d/%Y')}    SYNTHETIC SETTLEMENTS    PAGE 1"] + _format_heading(layout, widths)
+    for product in products:
+        lines.append(product)
+        base = rng.uniform(0.5, 120.0)
+        for n in range(n_months):
+            year = business_date.year + (business_date.month - 1 + n) // 12
+            month = MONTHS[(business_date.month - 1 + n) % 12]
+            sett = max(base * (1 + rng.normal(0, 0.01)), 0.01)
+            b_traded = rng.random() > 0.2
+            cells = [f"{month}{year % 100:02d}"]
+            if b_traded:
+                cells += [_format_price(sett * (1 + rng.normal(0, 0.005)), rng) for _ in range(4)]
+            else:
+                cells += ["", "", "", ""] # No trades: blank open/high/low/last.
+            cells += [_format_price(sett, rng), f"{rng.normal(0, 0.5):+.2f}",
+                      str(int(rng.integers(0, 99999))) if b_traded else "",
+                      _format_price(sett * (1 + rng.normal(0, 0.01)), rng),
+                      str(int(rng.integers(0, 99999))), str(int(rng.integers(0, 999999)))]
+            lines.append(_format_row(cells, widths).rstrip())
+        lines.append("TOTAL".ljust(widths[0]) + str(int(rng.integers(0, 999999))).rjust(FIELD_WIDTH * 7))
+
+    content = "\n".join(lines) + "\n"
+    with open(file_path, "w", encoding="utf8") as f:
+        f.write(content)
+    return file_path, products, len(content.encode("utf8"))
@@ -135,6 +135,18 @@ class AzureSynapseInstance():
             usd_to_cad: sa.orm.Mapped[float] = mapped_column("US to CA$", sa.Float, nullable=True)
         
         return tbl_stg_RTiPetchem
+
+    def get_tbl_stg_RTiPetchemCurve(self):
+        class tbl_stg_RTiPetchemCurve(self._Base):
+            __tablename__ = "RTiPetchemCurve"
+            __table_args__ = {"schema": "stg"}
+            date: sa.orm.Mapped[datetime.date] = mapped_column("Date", sa.Date, primary_key=True)
+            product: sa.orm.Mapped[str] = mapped_column("Product", sa.String, primary_key=True)
+            contract_month: sa.orm.Mapped[str] = mapped_column("ContractMonth", sa.String, primary_key=True)
+            settlement_price: sa.orm.Mapped[float] = mapped_column("Settlement_Price", sa.Float, nullable=True)
+            last_price: sa.orm.Mapped[float] = mapped_column("Last_Price", sa.Float, nullable=True)
+
+        return tbl_stg_RTiPetchemCurve
         
     def get_tbl_dbo_RTiPetchem(self):
         class tbl_dbo_RTiPetchem(self._Base):
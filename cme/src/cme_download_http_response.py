@@ -61,15 +61,18 @@ def cme_download_http_reponse():
             data = json.load(f)
             host = data["Values"]["SYNAPSE_INSTANCE"]
             adls_conn_string = data["Values"]["WEBSITE_CONTENTAZUREFILECONNECTIONSTRING"]
+            full_curve = data["Values"].get("CME_FULL_CURVE", "false")
     except FileNotFoundError or KeyError:
         host = os.environ["SYNAPSE_INSTANCE"]
         adls_conn_string = os.environ["WEBSITE_CONTENTAZUREFILECONNECTIONSTRING"]
+        full_curve = os.environ.get("CME_FULL_CURVE", "false")
+    b_full_curve = str(full_curve).lower() in ["true", "1"]
     
     try:
         # host1 = "rti-synapse-db.sql.azuresynapse.net" # SBX
         # host2 = "rti-synapse-pd.sql.azuresynapse.net" # PRD
         # pull_cme.main(host1)
-        pull_cme.main(host)
+        pull_cme.main(host, b_full_curve=b_full_curve)
     except Exception as e:
         logger.error(e)
         logger.error("run failed. \n")
@@ -0,0 +1,193 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-14
+# Notes: Rate-limit aware transport adapter for
+# requests.Session, replaces urllib3 Retry:
+#   session.mount("https://", RateLimitedAdapter(rate=5, max_concurrency=8))
+# Per host: a token bucket caps requests/second and
+# an adaptive limit caps requests in flight. A 429
+# (or 503) halves both and honors Retry-After for
+# the whole host; sustained fast 2xx raise them
+# again by one step (AIMD). Other retryable errors
+# back off exponentially with full jitter. A
+# Retry-After longer than max_retry_after is not
+# waited out: the response is returned.
+####################################
+
+import time, random, logging, threading
+import datetime, email.utils
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+THROTTLE_STATUS = (429, 503)
+RETRY_STATUS = (500, 502, 504)
+
+
+def parse_retry_after(value, now=None):
+    '''Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent.'''
+    if not value: return None
+    try: return max(0.0, float(value))
+    except ValueError: pass
+    try: retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError): return None
+    if now is None: now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+def jittered_backoff(attempt, base=0.5, cap=30.0):
+    '''Full jitter: uniform(0, min(cap, base * 2**attempt)).'''
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HostLimiter():
+    '''
+        Token bucket (rate, burst) plus an
+        adaptive in-flight limit for one host.
+    '''
+
+    def __init__(self, host, rate, burst, max_concurrency, min_concurrency=1, latency_target=2.0):
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.latency_target = latency_target
+        self.paused_until = 0.0
+        self.n_success = 0
+        self.stats = {"requests": 0, "throttled": 0, "retried": 0, "waited_s": 0.0}
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        '''Blocks for a concurrency slot, then for a token.'''
+        start = time.monotonic()
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = max(self.paused_until - now, 0.0)
+                if wait == 0.0 and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    break
+                if wait == 0.0: wait = (1.0 - self.tokens) / self.rate
+                self._cond.wait(timeout=wait)
+            self.stats["requests"] += 1
+            self.stats["waited_s"] += time.monotonic() - start
+
+    def count(self, key):
+        with self._cond:
+            self.stats[key] += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency):
+        '''Additive increase: +1 slot per `limit` fast responses.'''
+        with self._cond:
+            if latency > self.latency_target: return
+            self.n_success += 1
+            if self.n_success >= self.limit:
+                self.n_success = 0
+                self.limit = min(self.max_concurrency, self.limit + 1)
+                self.rate = min(self.max_rate, self.rate * 1.25)
+                self._cond.notify_all()
+
+    def on_throttle(self, retry_after=None):
+        '''Multiplicative decrease; Retry-After pauses the host.'''
+        with self._cond:
+            self.stats["throttled"] += 1
+            self.n_success = 0
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after is not None:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            logging.info(f"Throttled by {self.host}: limit {self.limit}, {self.rate:.2f} req/s, retry after {retry_after}.")
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    '''
+        rate/burst: requests per second per host.
+        max_concurrency: in-flight ceiling per host.
+        max_attempts: tries per request for 429,
+        5xx and connection errors. max_retry_after:
+        longest Retry-After waited (s). Other kwargs
+        go to HTTPAdapter (pool sizes).
+    '''
+
+    def __init__(self, rate: float=5.0, burst: int=None, max_concurrency: int=8, min_concurrency: int=1,
+                 max_attempts: int=5, backoff_base: float=0.5, backoff_cap: float=30.0, latency_target: float=2.0,
+                 max_retry_after: float=60.0, **kwargs):
+        super().__init__(**kwargs)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.latency_target = latency_target
+        self.max_retry_after = max_retry_after
+        self.limiters = {}
+        self._lock = threading.Lock()
+
+    def get_limiter(self, host):
+        with self._lock:
+            if host not in self.limiters:
+                self.limiters[host] = HostLimiter(host, self.rate, self.burst, self.max_concurrency,
+                                                  self.min_concurrency, self.latency_target)
+            return self.limiters[host]
+
+    def send(self, request, **kwargs):
+        limiter = self.get_limiter(urlsplit(request.url).hostname)
+        for attempt in range(self.max_attempts):
+            b_last = attempt == self.max_attempts - 1
+            limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if b_last: raise
+                limiter.count("retried")
+                time.sleep(jittered_backoff(attempt, self.backoff_base, self.backoff_cap))
+                continue
+            finally:
+                limiter.release()
+            latency = time.perf_counter() - start
+
+            if response.status_code in THROTTLE_STATUS:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                b_too_long = retry_after is not None and retry_after > self.max_retry_after
+                limiter.on_throttle(min(retry_after, self.max_retry_after) if retry_after is not None else None)
+                if b_too_long:
+                    logging.warning(f"HTTP {response.status_code} from {limiter.host}: Retry-After {retry_after:.0f} s exceeds {self.max_retry_after:.0f} s; not retrying.")
+                if b_last or b_too_long: return response
+                wait = retry_after if retry_after is not None else jittered_backoff(attempt, self.backoff_base, self.backoff_cap)
+            elif response.status_code in RETRY_STATUS:
+                if b_last: return response
+                wait = jittered_backoff(attempt, self.backoff_base, self.backoff_cap)
+            else:
+                limiter.on_success(latency)
+                return response
+
+            limiter.count("retried")
+            logging.info(f"HTTP {response.status_code} from {limiter.host}, attempt {attempt+1}/{self.max_attempts}; waiting {wait:.2f} s.")
+            response.close()
+            time.sleep(wait)
+
+    def log_host_stats(self):
+        for host, limiter in self.limiters.items():
+            print(f"{host}: {limiter.stats['requests']} requests, {limiter.stats['throttled']} throttled, "
+                  f"{limiter.stats['retried']} retried, limit {limiter.limit}, {limiter.rate:.2f} req/s.")
+            logging.info(f"HTTP client {host}: {limiter.stats}")
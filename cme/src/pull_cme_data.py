@@ -6,20 +6,21 @@
 # bloomberg_energy_url = "https://www.bloomberg.com/markets/api/comparison/data?securities=CL1%3ACOM,CO1%3ACOM,NG1%3ACOM&securityType=COMMODITY&locale=en"
 ####################################
 
-import os, csv, re
+import os, csv, re, io
 import requests, logging
 import pathlib as path
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
 import datetime, tempfile
 from sqlalchemy.orm import sessionmaker
 import sqlalchemy as sa
 import pandas as pd, numpy as np
 try: import cme.src.azsynapse as azsyn
 except ModuleNotFoundError: import azsynapse as azsyn
+try: import cme.src.http_client as http_client
+except ModuleNotFoundError: import http_client
 
 # CME Datamine does not support OAuth.
-FULL_COLUMN_COUNT = 11
+SETTLEMENT_COLUMNS = ["MTH_STRIKE", "DAILY_OPEN", "DAILY_HIGH", "DAILY_LOW", "DAILY_LAST",
+                      "SETT", "PNT_CHGE", "ACT_EST_VOL", "PREV_DAY_SETT", "PREV_DAY_VOL", "PREV_DAY_INT"]
 
 _26_CRUDE_OIL_LAST_DAY_FINANCIAL_FUTURES = "26 Crude Oil Last Day Financial Futures"                    # WTI
 B0_MONT_BELVIEU_LDH_PROPANE_OPIS_FUTURES = "B0 Mont Belvieu LDH Propane (OPIS) Futures"                 # Propane
@@ -29,6 +30,69 @@ C1_CANADIAN_DOLLAR_US_DOLLAR_CAD_USD_FUTURES = "C1 Canadian Dollar/U.S. Dollar (
 EC_EURO_US_DOLLAR_EUR_USD_FUTURES = "EC Euro/U.S. Dollar (EUR/USD) Futures"
 NG_HENRY_HUB_NATURAL_GAS_FUTURES = "NG Henry Hub Natural Gas Futures"
 
+# Instrument map: data set -> Azure column, source price field, and
+# whether the quote is inverted (e.g. CAD/USD -> US to CA$).
+CME_INSTRUMENT_MAP = {
+    _26_CRUDE_OIL_LAST_DAY_FINANCIAL_FUTURES: {"column": "WTI Crude Oil", "field": "Settlement_Price", "inverse": False},
+    B0_MONT_BELVIEU_LDH_PROPANE_OPIS_FUTURES: {"column": "Propane", "field": "Settlement_Price", "inverse": False},
+    BZ_BRENT_CRUDE_OIL_LAST_DAY_FINANCIAL_FUTURES: {"column": "Brent Crude Oil", "field": "Settlement_Price", "inverse": False},
+    C0_MONT_BELVIEU_ETHANE_OPIS_FUTURES: {"column": "Ethane", "field": "Settlement_Price", "inverse": False},
+    C1_CANADIAN_DOLLAR_US_DOLLAR_CAD_USD_FUTURES: {"column": "US to CA$", "field": "Last_Price", "inverse": True},
+    EC_EURO_US_DOLLAR_EUR_USD_FUTURES: {"column": "Euro to $US", "field": "Last_Price", "inverse": False},
+    NG_HENRY_HUB_NATURAL_GAS_FUTURES: {"column": "Nat. Gas", "field": "Settlement_Price", "inverse": False},
+}
+
+_POW10 = 10.0 ** np.arange(19)
+
+
+def parse_cme_price_notation(values) -> np.ndarray:
+    '''
+        Parses CME price notation into a float64 array.
+        Accepts any array-like; 2D input keeps its shape.
+
+        Notation: optional sign, digits with an optional
+        decimal point or a bare leading "." (".771"),
+        then anything else (status letters A/B) is ignored.
+        Blanks, "----" and "UNCH" become NaN.
+
+        Cells are viewed as a UCS4 code-point matrix and
+        scanned one character position at a time across
+        all cells, so the cost is O(width) numpy ops.
+    '''
+    arr = np.asarray(values, dtype=object)
+    cells = arr.ravel()
+    cells = np.char.strip(np.where(pd.isna(cells), "", cells).astype(str))
+    width = cells.dtype.itemsize // 4
+    chars = np.ascontiguousarray(cells.view(np.uint32).reshape(len(cells), width).T)
+
+    n = len(cells)
+    mantissa = np.zeros(n, dtype=np.int64)
+    n_digits = np.zeros(n, dtype=np.int64)
+    n_frac = np.zeros(n, dtype=np.int64)
+    n_dropped = np.zeros(n, dtype=np.int64) # Integer digits past the mantissa.
+    seen_dot = np.zeros(n, dtype=bool)
+    active = np.ones(n, dtype=bool)
+    negative = chars[0] == ord("-") if width else np.zeros(n, dtype=bool)
+
+    for i_char, c in enumerate(chars):
+        is_digit = (c >= ord("0")) & (c <= ord("9"))
+        is_dot = (c == ord(".")) & ~seen_dot
+        is_sign = (negative | (c == ord("+"))) if i_char == 0 else False
+        active &= is_digit | is_dot | is_sign
+        take = active & is_digit & (n_digits < 18) # int64 mantissa.
+        mantissa = np.where(take, mantissa * 10 + (c.astype(np.int64) - ord("0")), mantissa)
+        n_digits += take
+        n_frac += take & seen_dot
+        n_dropped += active & is_digit & ~take & ~seen_dot
+        seen_dot |= active & is_dot
+
+    # Exact integer / exact power of ten rounds like float(str).
+    out = mantissa / _POW10[n_frac]
+    if n_dropped.any(): out *= 10.0 ** n_dropped # Over 18 digits: beyond float64 precision anyway.
+    out[negative] *= -1.0
+    out[n_digits == 0] = np.nan
+    return out.reshape(arr.shape)
+
 
 class CMEDatamineAPI:
 
@@ -36,121 +100,80 @@ class CMEDatamineAPI:
         self.api_id = "API_RTIGLOBAL2" # Could make a call, but not really sensitive.
         self.api_pw = "QNErr#m94eq$nGHJNmnHTAh7" # Could make a call, but not really sensitive.
         self.base_endpoint = "https://datamine.cmegroup.com/cme/api/v1/download"
+        # One session for every download; the adapter paces Datamine and retries 429/5xx.
+        self.http_adapter = http_client.RateLimitedAdapter(rate=2.0, max_concurrency=4)
+        self.session = requests.Session()
+        self.session.mount("https://", self.http_adapter)
     
     def get_dfs_from_fid_dict(self, fid_dict, date=None):
         '''
             Calls download and processes
             the files into dfs for upsert.
-            Deletes the file as cleanup.
+            Each file is read once; every data set
+            section is sliced by column position.
         '''
-        def _process_file_into_df(temp_file_name, data_set):
-            
-            def __search_string_in_file_get_header_footer(filepath, search_header_str, search_footer_str):
-                """Searches for a string in a text file and prints matching lines."""
-                
-                with open(filepath, "rb") as temp_file:
-                    for row_number, line in enumerate(temp_file, 1):
-                        line = line.decode("utf8")
-                        if search_header_str in line:
-                            print(line.strip())
-                            header_row_number = row_number
-
-                            for r_n, line2 in enumerate(temp_file, row_number):
-                                line2 = line2.decode("utf8")
-                                if search_footer_str in line2:
-                                    print(line2.strip())
-                                    footer_row_number = r_n
-                                    break
-                            break
-                    temp_file.close()
+        def _process_lines_into_df(lines, data_set, colspecs_cache):
+
+            def __search_section_header_footer(lines, search_header_str, search_footer_str):
+                '''Returns line indexes of the data set title and its TOTAL footer.'''
+                header_row_number = next((n for n, line in enumerate(lines) if search_header_str in line), None)
+                if header_row_number is None:
+                    raise ValueError(f"Data set '{search_header_str}' not found in settlement file.")
+                footer_row_number = next((n for n in range(header_row_number+1, len(lines)) if search_footer_str in lines[n]), len(lines))
                 return header_row_number, footer_row_number
-            
-            def __extract_subset_file_to_df(file_path, data_set, header_row_number, footer_row_number):
-                '''Extract specific subset; simplifies dataframe creation'''
-
-                def ___get_trimmed_line_list(data_set, line):
-                    '''
-                        This is specific to the dataset.
-                        Each new dataset needs its own
-                        logic.
-
-                        CSV reader delimiter requires 1 character
-                        string, special implementation logic necessary.
-                    '''
-
-                    def ____define_null_column_handlers_list(data_set):
-                        ''' Parse logic params: 
-                            {n1:[(i11, k11), (i12, k12), ...], n2:[(i21, k21), (i22, k22), ...], ...}
-                            n = Number of Columns with Data.
-                            i_ = Column iterated upon from 0 to len -1.
-                            k_ = number of '' columns to add to list
-                        '''
-
-                        # Split for customization.
-                        if data_set == _26_CRUDE_OIL_LAST_DAY_FINANCIAL_FUTURES: list_handler = {10:[(7,1)], 9:[(6, 1), (7, 1)], 8:[(6, 1), (7, 2)]}
-                        elif data_set == B0_MONT_BELVIEU_LDH_PROPANE_OPIS_FUTURES: list_handler = {10:[(7,1)], 9:[(6, 1), (7, 1)], 8:[(6, 1), (7, 2)]}
-                        elif data_set == BZ_BRENT_CRUDE_OIL_LAST_DAY_FINANCIAL_FUTURES: list_handler = {10:[(7,1)], 9:[(6, 1), (7, 1)], 8:[(6, 1), (7, 2)]}
-                        elif data_set == C0_MONT_BELVIEU_ETHANE_OPIS_FUTURES: list_handler = {10:[(7,1)], 9:[(6, 1), (7, 1)], 8:[(6, 1), (7, 2)]}
-                        elif data_set == C1_CANADIAN_DOLLAR_US_DOLLAR_CAD_USD_FUTURES: list_handler = {10:[(7,1)], 9:[(6, 1), (7, 1)], 8:[(6, 1), (7, 2)]}
-                        elif data_set == EC_EURO_US_DOLLAR_EUR_USD_FUTURES: list_handler = {10:[(7,1)], 9:[(6, 1), (7, 1)], 8:[(6, 1), (7, 2)]}
-                        elif data_set == NG_HENRY_HUB_NATURAL_GAS_FUTURES: list_handler = {10:[(7,1)], 9:[(6, 1), (7, 1)], 8:[(6, 1), (7, 2)]}
-                        return list_handler
-                    
-                    # Write data, csv style:
-                    list_h = ____define_null_column_handlers_list(data_set) # dataset level
-                    line_list = line.split()
-                    list_count = len(line_list)
-
-                    # trim with new_line_list:
-                    if list_count < FULL_COLUMN_COUNT:
-                        new_line_list = []
-                        for i_field, field in enumerate(line_list, 0):
-                            if list_count not in list_h.keys(): 
-                                new_line_list.append(field)
-                            else:
-                                new_line_list.append(field)
-                                for i_col, ncol in list_h[list_count]:
-                                    if i_col == i_field:
-                                        # doesn't pass on wrong field--good.
-                                        for _ in range(ncol): 
-                                            new_line_list.append('')
-                        line_list = new_line_list
-                    else:
-                        pass
-                    trimmed_line = ",".join(line_list)
-                    trimmed_line = f"\n{trimmed_line}"
-                    return trimmed_line
-                                
-                # Write header, csv style:
-                with tempfile.NamedTemporaryFile(prefix="output-", suffix=".txt", mode='a', delete=False) as temp_file:
-                    temp_file_path = temp_file.name
-                
-                with open(file_path, 'r') as infile, open(temp_file_path, 'w') as outfile:
-                    columns = ["MTH_STRIKE", "DAILY_OPEN", "DAILY_HIGH", "DAILY_LOW", "DAILY_LAST", 
-                               "SETT", "PNT_CHGE", "ACT_EST_VOL", "PREV_DAY_SETT", "PREV_DAY_VOL", "PREV_DAY_INT"]
-                    for col in columns[:-1]: 
-                        col_ = f"{col},"
-                        outfile.write(col_)
-                    outfile.write(columns[-1])
-                    
-                    # Write data, csv style:
-                    for i_row, line in enumerate(infile):
-                        if i_row >= header_row_number and i_row < footer_row_number:
-                            print(line)
-                            line_list = line.split()
-                            trimmed_line = ",".join(line_list)
-                            trimmed_line = f"\n{trimmed_line}"
-
-                            trimmed_line = ___get_trimmed_line_list(data_set, line) # trim it.
-                            outfile.write(trimmed_line)
-                    infile.close()
-                    outfile.close()
-                outfile = temp_file.name # reinitialize.
-                df = pd.read_csv(filepath_or_buffer=temp_file.name, delimiter=',')
-                # os.remove(f"Output_{file_path}") # remove extraction file.
 
+            def __infer_colspecs(lines, header_row_number):
+                '''
+                    Column spans from the heading above the section:
+                    the nearest line with a SETT heading plus up to
+                    two lines stacked over it ("MTH/" over "STRIKE",
+                    "PT." over "CHGE"). Dashed banners ("---- PRIOR
+                    DAY ----") are ignored, and names split by one
+                    space ("PRIOR SETT") count as one heading when
+                    that gives SETTLEMENT_COLUMNS columns. Values are
+                    right-aligned under their headings and may carry
+                    a one-letter status suffix (A/B), so a field runs
+                    from one past the end of the previous heading to
+                    one past the end of its own; the first starts at
+                    0 and the last runs to end of line. Cached per
+                    heading. Falls back to read_fwf's "infer" (logged).
+                '''
+                n_columns = len(SETTLEMENT_COLUMNS)
+                n_heading = next((n for n in range(header_row_number-1, -1, -1) if re.search(r"\bSETT\b", lines[n])), None)
+                if n_heading is None:
+                    block = None
+                else:
+                    n_top = n_heading
+                    while n_heading - n_top < 2 and n_top > 0 and lines[n_top-1].strip() and not re.search(r"\d", lines[n_top-1]):
+                        n_top -= 1
+                    block = tuple(line.rstrip("\r\n") for line in lines[n_top:n_heading+1])
+                    if block not in colspecs_cache:
+                        # Character positions under any heading word:
+                        occupied = [" "] * (max(len(line) for line in block) + 1)
+                        for line in block:
+                            line = re.sub(r"-{2,}[^-]*-{2,}", lambda m: " " * len(m.group()), line)
+                            for m in re.finditer(r"\S+", line): occupied[m.start():m.end()] = "x" * (m.end() - m.start())
+                        occupied = "".join(occupied)
+                        colspecs_cache[block] = None
+                        for pattern in (r"x+", r"x+(?: x+)*"):
+                            ends = [m.end()+1 for m in re.finditer(pattern, occupied)]
+                            if len(ends) == n_columns:
+                                colspecs_cache[block] = list(zip([0] + ends[:-1], ends[:-1] + [None]))
+                                break
+                if block is None or colspecs_cache[block] is None:
+                    message = f"No {n_columns}-column heading found above '{lines[header_row_number].strip()}'; read_fwf will infer the columns."
+                    print(message)
+                    logging.warning(message)
+                    return "infer"
+                return colspecs_cache[block]
+
+            def __extract_section_to_df(lines, header_row_number, footer_row_number, colspecs):
+                '''Slices fields by position in one read_fwf call.'''
+                block = [line for line in lines[header_row_number+1:footer_row_number] if line.strip()]
+                df = pd.read_fwf(io.StringIO("".join(block)), colspecs=colspecs, infer_nrows=max(len(block), 1),
+                                 header=None, names=SETTLEMENT_COLUMNS, dtype=str)
                 return df
-            
+
             def __clean_inconsistent_columns(df):
                 ''' 
                 Only Columns 0 to 6 are useable and 
@@ -160,9 +183,10 @@ class CMEDatamineAPI:
                 df_ = df.iloc[:, :6]
                 return df_
 
-            # Search file
-            header, footer = __search_string_in_file_get_header_footer(filepath=temp_file_name, search_header_str=data_set, search_footer_str="TOTAL")
-            df = __extract_subset_file_to_df(file_path=temp_file_name, data_set=data_set, header_row_number=header, footer_row_number=footer )
+            # Search lines:
+            header, footer = __search_section_header_footer(lines, search_header_str=data_set, search_footer_str="TOTAL")
+            colspecs = __infer_colspecs(lines, header)
+            df = __extract_section_to_df(lines, header, footer, colspecs)
             df = __clean_inconsistent_columns(df)
             return df
         
@@ -171,9 +195,12 @@ class CMEDatamineAPI:
         dict_dfs = {}
         for fid, data in fid_dict.items():
             temp_file_name = self.download_and_get_file(fid=fid, date=date)
+            with open(temp_file_name, "r", encoding="utf8") as f:
+                lines = f.read().splitlines(keepends=True)
 
+            colspecs_cache = {}
             for data_set in data:
-                df = _process_file_into_df(temp_file_name, data_set)
+                df = _process_lines_into_df(lines, data_set, colspecs_cache)
                 dict_dfs[data_set] = df
 
             # os.remove(file_name)
@@ -188,21 +215,9 @@ class CMEDatamineAPI:
         '''
 
         def _execute_call(fid_endpoint):
-            # Define the retry strategy.
-            retry_strategy = Retry(
-                total=4,  # Maximum number of retries.
-                status_forcelist=[429, 500, 502, 503, 504],  # the HTTP status codes to retry on.
-            )
-            
-            adapter = HTTPAdapter(max_retries=retry_strategy)
-            
-            # Create a new session object.
-            session = requests.Session()
-            session.mount("https://", adapter)
-
-            # Make a request using the session object.
+            # Make a request using the shared, rate-limited session.
             url = f"{self.base_endpoint}?fid={fid_endpoint}"
-            response = session.get(url, auth=(self.api_id, self.api_pw))
+            response = self.session.get(url, auth=(self.api_id, self.api_pw))
             return response, url
         
         def _get_last_business_day(today_datetime, n_past_days):
@@ -260,47 +275,92 @@ class CMEDatamineAPI:
 
     def clean_df(self, df, columns_to_keep):
         '''
-            Remove non-numeric columns.
+            Remove non-numeric columns. Price columns
+            are normalized together into float64.
         '''
-        
-        df = df[columns_to_keep]
-        df = df.astype(str)
-        for col in df.columns:
-            if col not in ["MTH_STRIKE", "DATA_SET"]:
-                # df[col] = "0.771A" # test -- good
-                df[col] = df[col].str.replace(r'^\.', '0.', regex=True)
-                df[col] = df[col].str.extract(r'(\d+\.?\d*)', expand=False).astype(float)
+
+        df = df[columns_to_keep].copy()
+        label_cols = [col for col in df.columns if col in ["MTH_STRIKE", "DATA_SET"]]
+        price_cols = [col for col in df.columns if col not in label_cols]
+        df[label_cols] = df[label_cols].astype(str)
+        if price_cols:
+            prices = parse_cme_price_notation(df[price_cols].to_numpy(dtype=object))
+            df[price_cols] = pd.DataFrame(prices, index=df.index, columns=price_cols)
         return df
-    
+
     def transform_df_for_azure_upsert(self, df, date=None):
+        '''
+            Maps each data set onto its Azure column
+            through CME_INSTRUMENT_MAP; one row per date.
+        '''
 
-        def _set_short_names(data_set, date=None):
-            def __take_inverse(num: float) -> float:
-                if num != 0.0:
-                    return 1/num;
-                else: return num
-            if date is not None: df = pd.DataFrame({"Date":[date.strftime("%Y-%m-%d")]});
-            else: df = pd.DataFrame({"Date":[datetime.datetime.now().strftime("%Y-%m-%d")]});
-            for n, data in enumerate(data_set):
-                if data[1] == "26 Crude Oil Last Day Financial Futures":
-                    df["WTI Crude Oil"] = [data[3]] # Settlement
-                elif data[1] == "B0 Mont Belvieu LDH Propane (OPIS) Futures":
-                    df["Propane"] = [data[3]] # Settlement
-                elif data[1]  == "BZ Brent Crude Oil Last Day Financial Futures":
-                    df["Brent Crude Oil"] = [data[3]] # Settlement
-                elif data[1]  == "C0 Mont Belvieu Ethane (OPIS) Futures":
-                    df["Ethane"] = [data[3]] # Settlement
-                elif data[1]  == "C1 Canadian Dollar/U.S. Dollar (CAD/USD) Futures":
-                    df["US to CA$"] = [__take_inverse(float(data[4]))] # Last
-                elif data[1]  == "EC Euro/U.S. Dollar (EUR/USD) Futures":
-                    df["Euro to $US"] = [data[4]] # Last
-                elif data[1]  == "NG Henry Hub Natural Gas Futures":
-                    df["Nat. Gas"] = [data[3]] # Settlement
-            return df
+        def _select_prices(df_):
+            price_fields = ["Settlement_Price", "Last_Price"]
+            field_index = df_["field"].map({field: n for n, field in enumerate(price_fields)}).to_numpy()
+            prices = df_[price_fields].to_numpy(dtype=np.float64)[np.arange(len(df_)), field_index]
+            inverse = df_["inverse"].to_numpy(dtype=bool) & (prices != 0.0)
+            return np.divide(1.0, prices, out=prices.copy(), where=inverse)
 
-        records = df.to_records();
-        df = _set_short_names(records, date)
-        return df
+        if date is None: date = datetime.datetime.now()
+        instruments = pd.DataFrame.from_dict(CME_INSTRUMENT_MAP, orient="index")
+        df_ = df.join(instruments, on="Data_Set", how="inner")
+        values = _select_prices(df_)
+
+        row = {"Date": [date.strftime("%Y-%m-%d")]}
+        for column, value in zip(df_["column"], values):
+            row[column] = [value] # Last one wins.
+        return pd.DataFrame(row)
+
+    def transform_dfs_for_curve_upsert(self, dict_dfs, date=None):
+        '''
+            Long-format curve: one row per
+            (Date, Product, ContractMonth), every
+            contract month of every product. Quotes
+            are kept as published (no inversion).
+        '''
+        if date is None: date = datetime.datetime.now()
+        dict_dfs_ = {k: df.copy() for k, df in dict_dfs.items()}
+        df = self.concat_dfs_into_sum_df(dict_dfs_)
+        df = df[df["MTH_STRIKE"].notna() & df["MTH_STRIKE"].astype(str).str.strip().ne("")]
+        df = self.clean_df(df, ["DATA_SET", "MTH_STRIKE", "SETT", "DAILY_LAST"])
+        df = df.rename(columns={"DATA_SET":"Product", "MTH_STRIKE":"ContractMonth", "SETT":"Settlement_Price", "DAILY_LAST":"Last_Price"})
+        df.insert(0, "Date", date.strftime("%Y-%m-%d"))
+        df = df.drop_duplicates(subset=["Date", "Product", "ContractMonth"], keep="last")
+        return df.reset_index(drop=True)
+
+    def upload_cme_curve_data(self, host, df):
+        '''
+            Replaces the curve for the loaded date(s) with
+            one parameterized executemany batch.
+        '''
+
+        def _exec_bulk_upsert(az_syn, df, tbl):
+            df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d").dt.date
+            records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+            dates = sorted(df["Date"].unique())
+
+            Session = sessionmaker(az_syn.engine)
+            with Session() as session:
+                # Keyed clear, then one batch insert:
+                sql_del = sa.delete(tbl).where(tbl.date.in_(dates))
+                logging.info(f"{sql_del} -- dates: {dates}")
+                session.execute(sql_del)
+                session.execute(sa.insert(tbl.__table__), records) # Column-name keys.
+                logging.info(f"Inserted {len(records)} curve rows into {tbl.__table__.fullname}.")
+                # session.commit() # Set to autocommit for Az Syn.
+                session.close()
+
+        if df.empty: return
+
+        # ODBC General authentication:
+        driver = "{ODBC Driver 18 for SQL Server}"
+        port = 1433
+        database = "synapsesqlserver"
+        timeout = "30"
+
+        az_syn = azsyn.AzureSynapseInstance(driver=driver, host=host, port=port, database=database, timeout=timeout)
+        tbl_stg_RTiPetchemCurve = az_syn.get_tbl_stg_RTiPetchemCurve()
+        _exec_bulk_upsert(az_syn, df, tbl_stg_RTiPetchemCurve)
 
     def upload_cme_data(self, host, df):
         
@@ -375,7 +435,11 @@ class CMEDatamineAPI:
     url = 'https://datamine.cmegroup.com/cme/api/v1/batchdownload?dataset=eod&yyyymmdd=20241120&period=f'
     
 
-def main(host):
+def main(host, b_full_curve=False):
+    '''
+        b_full_curve: also writes every contract month
+        of each product to stg.RTiPetchemCurve.
+    '''
 
     fid_dict = {"STLBASIC_NYMEX_STLCPC_EOM_0": [_26_CRUDE_OIL_LAST_DAY_FINANCIAL_FUTURES,
                                                 B0_MONT_BELVIEU_LDH_PROPANE_OPIS_FUTURES,
@@ -395,12 +459,21 @@ def main(host):
     # date_str = "2024-12-16" # The day in the db that needs correction.
     # date = datetime.datetime.strptime(date_str, "%Y-%m-%d")
     dict_dfs = cme.get_dfs_from_fid_dict(fid_dict=fid_dict, date=date)
+    if b_full_curve: df_curve = cme.transform_dfs_for_curve_upsert(dict_dfs=dict_dfs, date=date) # Before trimming.
     dict_dfs = cme.trim_top_month_on_dfs(dict_dfs=dict_dfs)
     df = cme.concat_dfs_into_sum_df(dict_dfs)
     df = cme.clean_df(df, ["DATA_SET", "MTH_STRIKE", "SETT", "DAILY_LAST"])
     df.rename(columns={"DATA_SET":"Data_Set", "MTH_STRIKE":"Month", "SETT":"Settlement_Price", "DAILY_LAST":"Last_Price"}, inplace=True)
     df = cme.transform_df_for_azure_upsert(df=df, date=date)
     cme.upload_cme_data(host, df)
+    # The curve is optional: a failure must not cost the daily load above.
+    if b_full_curve:
+        try:
+            cme.upload_cme_curve_data(host, df_curve)
+        except Exception as e:
+            print(f"Curve upload failed: {e}")
+            logging.error(f"CME curve upload failed: {e}")
+    cme.http_adapter.log_host_stats()
     print(df)
 
 if __name__ == "__main__":
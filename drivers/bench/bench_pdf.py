@@ -0,0 +1,97 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-28
+# Notes: Offline benchmark of driver PDF page
+# extraction: the direct page scan (scan_pdf_pages)
+# against the pymupdf4llm markdown path, on a folder
+# of driver PDFs (e.g. downloaded from
+# drivers-historical-pdfs) or, without one, on
+# synthetic PDFs with a header, headings, a date and
+# a contact line per page. Reports time per PDF,
+# PDFs/min and whether headers and dates agree, and
+# for a PDF that does not, which pages differ and how.
+# Run from the project root:
+#   python -m drivers.bench.bench_pdf --pdf-dir ./driver_pdfs
+####################################
+
+import os, time, argparse
+import pymupdf
+import pandas as pd
+import drivers.src.process_pdf as proc_pdf
+
+PRODUCTS = ["PE", "PP", "PS", "ABS", "PVC", "PC", "PA66", "PA6", "PET"]
+
+
+def build_pdf(n_pages, body_lines=40):
+    '''PDF bytes: one product page each, with title, headings, date, body and contact line.'''
+    doc = pymupdf.open()
+    for n in range(n_pages):
+        product = PRODUCTS[n % len(PRODUCTS)]
+        page = doc.new_page()
+        page.insert_text((72, 60), f"{product} DRIVERS", fontsize=24, fontname="hebo")
+        page.insert_text((72, 90), f"{product} market outlook", fontsize=18, fontname="hebo")
+        page.insert_text((72, 115), "Key Drivers", fontsize=15, fontname="hebo")
+        page.insert_text((72, 140), f"March {2020 + n % 6}", fontsize=13.5)
+        for k in range(body_lines):
+            page.insert_text((72, 165 + 14 * k), f"Demand, feedstock and margin commentary, paragraph {k}.", fontsize=10)
+        page.insert_text((72, 760), f"For additional {product} information contact your RTi analyst.", fontsize=9)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+def describe_differences(df_markdown, df_scan, max_pages=5):
+    '''Why two frames differ: page counts, then per page header and date.'''
+    reasons = []
+    if len(df_markdown) != len(df_scan):
+        reasons.append(f"pages: markdown {len(df_markdown)}, scan {len(df_scan)}")
+    if list(df_markdown.columns) != list(df_scan.columns):
+        reasons.append(f"columns: markdown {list(df_markdown.columns)}, scan {list(df_scan.columns)}")
+        return reasons
+    b_header = b_date = False
+    for (_, row_markdown), (_, row_scan) in zip(df_markdown.iterrows(), df_scan.iterrows()):
+        for column in ("headers", "dates"):
+            if row_markdown[column] != row_scan[column] and not (pd.isna(row_markdown[column]) and pd.isna(row_scan[column])):
+                if len(reasons) < max_pages: reasons.append(f"page {row_scan['pages']} {column}: markdown {row_markdown[column]!r}, scan {row_scan[column]!r}")
+                b_header |= column == "headers"; b_date |= column == "dates"
+    if not reasons:
+        reasons.append(f"dtypes: markdown {dict(df_markdown.dtypes.astype(str))}, scan {dict(df_scan.dtypes.astype(str))}")
+    elif b_date and not b_header and df_scan["dates"].isna().all():
+        reasons.append("scan found no dates: the date is not in a heading size")
+    return reasons
+
+def main(pdf_dir, n_synthetic, n_pages):
+    if pdf_dir is not None:
+        pdfs = [(file_name, open(os.path.join(pdf_dir, file_name), "rb").read())
+                for file_name in sorted(os.listdir(pdf_dir)) if file_name.lower().endswith(".pdf")]
+    else:
+        pdfs = [(f"synthetic_{n}.pdf", build_pdf(n_pages)) for n in range(n_synthetic)]
+    print(f"pdfs={len(pdfs)} MB={sum(len(pdf_bytes) for _, pdf_bytes in pdfs)/1e6:.2f}")
+
+    walls = {"markdown": 0.0, "scan": 0.0}
+    n_same = 0
+    for pdf_Name, pdf_bytes in pdfs:
+        frames = {}
+        for extractor in walls:
+            frames[extractor], wall = _timed(proc_pdf.process_pdf_bytes, pdf_bytes, pdf_Name, extractor=extractor)
+            walls[extractor] += wall
+        b_same = frames["markdown"].equals(frames["scan"])
+        n_same += b_same
+        if not b_same:
+            print(f"  {pdf_Name}: headers/dates differ")
+            for reason in describe_differences(frames["markdown"], frames["scan"]): print(f"    {reason}")
+    for extractor, wall in walls.items():
+        print(f"  {extractor:8s} {wall/len(pdfs):8.3f} s/pdf {len(pdfs)/(wall/60):10.1f} PDFs/min")
+    print(f"  speedup {walls['markdown']/walls['scan']:.1f}x, {n_same}/{len(pdfs)} PDFs agree")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--pdf-dir", default=None)
+    arg_parser.add_argument("--synthetic", type=int, default=5)
+    arg_parser.add_argument("--pages", type=int, default=9)
+    args = arg_parser.parse_args()
+    main(args.pdf_dir, args.synthetic, args.pages)
@@ -7,11 +7,17 @@
 import os, csv, re
 import logging
 import pathlib as path
-import pymupdf4llm
+import collections, functools, datetime
+import pymupdf, pymupdf4llm
 import tempfile
 import pandas as pd
 from dateutil import parser
 
+# App setting; "markdown": pymupdf4llm; "scan": direct page scan, once bench_pdf --pdf-dir agrees on real PDFs.
+DRIVERS_PDF_EXTRACTOR = os.environ.get("DRIVERS_PDF_EXTRACTOR", "markdown")
+DRIVERS_TOP_BLOCKS = 8 # Text blocks per page searched for the header and date.
+DRIVERS_BODY_LIMIT = 12 # As pymupdf4llm: font sizes above body text (at least this) are headings.
+
 def file_to_byte_array(input_file_path):
     ret = None
     try:
@@ -38,141 +44,105 @@ def check_file_encoding(input_file_path):
             print("Error: Could not decode file with Latin-1 encoding either.")
     return ret
 
+# Product headers, tried in order on a "# ...DRIVERS" heading with spaces
+# removed, upper case; PE excludes PET, PA66 goes before PA6:
+HEADER_PATTERNS = [
+    ("PE DRIVERS", re.compile("PE|POLYETHYLENE"), re.compile("PET")),
+    ("PP DRIVERS", re.compile("PP|POLYPROPYLENE"), None),
+    ("PS DRIVERS", re.compile("PS|POLYSTYRENE"), None),
+    ("ABS DRIVERS", re.compile("ABS"), None),
+    ("PVC DRIVERS", re.compile("PVC"), None),
+    ("PC DRIVERS", re.compile("PC|POLYCARBONATE"), None),
+    ("PA66 DRIVERS", re.compile("PA66"), None),
+    ("PA6 DRIVERS", re.compile("PA6"), None),
+    ("PET DRIVERS", re.compile("PET"), None),
+]
+# Contact lines ("For additional PE information", "# RTi PE Outlook and
+# Suggested"), by the names each product goes by, in order:
+CONTACT_PATTERNS = [(f"{product} DRIVERS", re.compile(f"For additional (?:{'|'.join(names)}) information|# RTi {product} Outlook and Suggested"))
+    for product, names in [("PE", ["PE"]), ("PP", ["PP"]), ("PS", ["PS"]), ("ABS", ["ABS"]), ("PC", ["PC"]), ("PVC", ["PVC"]),
+                           ("PA66", ["PA66", "Nylon PA66"]), ("PA6", ["PA6", "Nylon PA6", "Nylon"]), ("PET", ["PET"])]]
+DATE_HEADING_RE = re.compile(r"#{3,6} ") # "### " .. "###### ".
+DATE_YEAR_RE = re.compile(r"20(?:1[5-9]|2[0-9]|3[0-4])") # 2015-2034.
+DATE_MARKS_RE = re.compile(r"#{3,6} |\n")
+DATE_DEFAULT = datetime.datetime(2000, 1, 1) # Fills what a heading leaves out: "March 2025" is 2025-03-01.
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(text):
+    '''
+        Cached: the same date headings repeat across
+        pages and PDFs. A fixed default, not today, so a
+        cached date does not depend on the run day.
+    '''
+    try: return parser.parse(text, default=DATE_DEFAULT)
+    except (ValueError, OverflowError): return None
+
+def classify_line(line):
+    '''
+        One pass over a line: (header, header_contact,
+        date), each None when the line is not one.
+    '''
+    header = None; header_contact = None; date = None
+    if line[0:2] == "# " and "DRIVERS" in line:
+        line_ = line.replace(" ", "").upper()
+        for product_header, pattern, excluded in HEADER_PATTERNS:
+            if pattern.search(line_) and not (excluded and excluded.search(line_)):
+                header = product_header
+                break
+    else:
+        contact_line = line.replace("**", "").replace("_", "")[0:40]
+        for product_header, pattern in CONTACT_PATTERNS:
+            if pattern.search(contact_line):
+                header_contact = product_header
+                break
+    if DATE_HEADING_RE.match(line) and DATE_YEAR_RE.search(line):
+        date = _parse_date(DATE_MARKS_RE.sub("", line))
+    return header, header_contact, date
+
+def _process_page(line, page):
+    if line[0:5] == "-----":
+        page+=1
+        b_page = True
+    else:
+        pass
+        b_page = False
+    return page, b_page
+
+def _post_process_data_into_df(pages, headers, dates, pdf_Name, b_same_dates, b_trailing_page=True):
+    if b_trailing_page: pages = pages[:-1] # Page opened by the last "-----".
+    headers_ = "headers"
+    try:
+        if b_same_dates and len(pages) != len(dates):
+            dates = [dates[0] for i in range(0, len(pages))]
+        df = pd.DataFrame(data={"pages":pages, headers_:headers, "dates":dates})
+    except Exception:
+        df = pd.DataFrame(data={"pages":pages, headers_:[f"Error{i}" for i in range(0, len(pages))], "dates":[None for i in range(0, len(pages))]})
+
+    s_header = df[[headers_]].groupby(by=[headers_])[[headers_]].count()[headers_]
+    index_ = df[df[headers_].isin(s_header[s_header>1].index.to_list())].index
+    df.loc[index_, (headers_)] = ""
+
+    for i in range(0, df[headers_].shape[0]):
+        if df[headers_].iloc[i] == "": df[headers_].iloc[i] = f"Error{i}"
+
+    df["pdfName"] = pdf_Name
+    print(df)
+
+    return df
+
 def process_pdf_return_data(input_file, output_file, pdf_Name):
 
     def _process_pdf_to_text_output(input_file, output_file):
-        md_text = pymupdf4llm.to_markdown(input_file)
+        # Pages joined by the "-----" break counted below; pymupdf4llm no
+        # longer writes one, and its layout engine does not make the date
+        # a heading, so the font size (rag) converter is used per page:
+        chunks = pymupdf4llm.helpers.pymupdf_rag.to_markdown(input_file, page_chunks=True)
+        md_text = "".join(chunk["text"] + "\n-----\n\n" for chunk in chunks)
         path.Path(output_file).write_bytes(md_text.encode())
         return output_file
 
     def _get_df_from_processed_text_file(text_file, input_file, pdf_Name):
 
-        def __process_header(line, header, header_contact):
-            print(line);
-            contact_line = line.replace("**", "").replace("_", "")[0:40]
-            b = False
-            if line[0:2] == "# " and "DRIVERS" in line:
-                if ("PE" in line.replace(" ", "").upper() or "POLYETHYLENE" in line.replace(" ", "").upper()) and "PET" not in line.replace(" ", "").upper():
-                    header = "PE DRIVERS"
-                    b = True
-                elif "PP" in line.replace(" ", "").upper() or "POLYPROPYLENE" in line.replace(" ", "").upper(): 
-                    header = "PP DRIVERS"
-                    b = True
-                elif "PS" in line.replace(" ", "").upper() or "POLYSTYRENE" in line.replace(" ", "").upper(): 
-                    header = "PS DRIVERS"
-                    b = True
-                elif "ABS" in line.replace(" ", "").upper(): 
-                    header = "ABS DRIVERS"
-                    b = True
-                elif "PVC" in line.replace(" ", "").upper(): 
-                    header = "PVC DRIVERS"
-                    b = True
-                elif "PC" in line.replace(" ", "").upper() or "POLYCARBONATE" in line.replace(" ", "").upper(): 
-                    header = "PC DRIVERS"
-                    b = True
-                elif "PA66" in line.replace(" ", "").upper(): 
-                    header = "PA66 DRIVERS"
-                    b = True
-                elif "PA6" in line.replace(" ", "").upper(): 
-                    header = "PA6 DRIVERS"
-                    b = True
-                elif "PET" in line.replace(" ", "").upper():
-                    header = "PET DRIVERS" 
-                    b = True
-            elif "For additional" in contact_line or "Outlook and Suggested" in contact_line:
-                b = False
-                if "For additional PE information" in contact_line or "# RTi PE Outlook and Suggested" in contact_line:
-                    header_contact = "PE DRIVERS"
-                    b = False
-                elif "For additional PP information" in contact_line or "# RTi PP Outlook and Suggested" in contact_line:
-                    header_contact = "PP DRIVERS"
-                    b = False
-                elif "For additional PS information" in contact_line or "# RTi PS Outlook and Suggested" in contact_line:
-                    header_contact = "PS DRIVERS"
-                    b = False
-                elif "For additional ABS information" in contact_line or "# RTi ABS Outlook and Suggested" in contact_line:
-                    header_contact = "ABS DRIVERS"
-                    b = False
-                elif "For additional PC information" in contact_line or "# RTi PC Outlook and Suggested" in contact_line:
-                    header_contact = "PC DRIVERS"
-                    b = False
-                elif "For additional PVC information" in contact_line or "# RTi PVC Outlook and Suggested" in contact_line:
-                    header_contact = "PVC DRIVERS"
-                    b = False
-                elif "For additional PA66 information" in contact_line or "For additional Nylon PA66 information" in contact_line or "# RTi PA66 Outlook and Suggested" in contact_line:
-                    header_contact = "PA66 DRIVERS"
-                    b = False
-                elif "For additional PA6 information" in contact_line or "For additional Nylon PA6 information" in contact_line or "For additional Nylon information" in contact_line or \
-                "# RTi PA6 Outlook and Suggested" in contact_line:
-                    header_contact = "PA6 DRIVERS"
-                    b = False
-                elif "For additional PET information" in contact_line or "# RTi PET Outlook and Suggested" in contact_line:
-                    header_contact = "PET DRIVERS"
-                    b = False
-            else:
-                header = ""
-                b = False
-            return (header, header_contact, b)
-
-        def __process_date(line, date, b_date): 
-            print(line)
-            if line[0:4] == "### " or line[0:5] == "#### " or line[0:6] == "##### " or line[0:7] == "###### ":
-                b_date_test = False
-                for year in range(2015, 2035, 1):
-                    year_ = str(year)
-                    if year_ in line: 
-                        b_date_test = True
-                        break
-                if b_date_test:
-                    if year_ in line: 
-                        try:
-                            line_ = line.replace("###### ", "").replace("##### ", "").replace("#### ", "").replace("### ", "").replace("\n", "")
-                            date_ = parser.parse(line_)
-                            b_date = True
-                        except ValueError as e:
-                            date_ = None
-                            b_date = False
-                else:
-                    date_ = ""
-                    b_date = False
-            else:
-                date_ = ""
-                b_date = False
-            
-            return date_, b_date
-
-        def __process_page(line, page):
-            print(line)
-            if line[0:5] == "-----":
-                page+=1
-                b_page = True
-            else:
-                pass
-                b_page = False
-            return page, b_page
-        
-        def __post_process_data_into_df(pages, headers, dates, pdf_Name, b_same_dates):
-            pages = pages[:-1]
-            headers_ = "headers"
-            try:
-                if b_same_dates and len(pages) != len(dates):
-                    dates = [dates[0] for i in range(0, len(pages))]
-                df = pd.DataFrame(data={"pages":pages, headers_:headers, "dates":dates})
-            except Exception:
-                df = pd.DataFrame(data={"pages":pages, headers_:[f"Error{i}" for i in range(0, len(pages))], "dates":[None for i in range(0, len(pages))]})
-
-            s_header = df[[headers_]].groupby(by=[headers_])[[headers_]].count()[headers_]
-            index_ = df[df[headers_].isin(s_header[s_header>1].index.to_list())].index
-            df.loc[index_, (headers_)] = ""
-            
-            for i in range(0, df[headers_].shape[0]):
-                if df[headers_].iloc[i] == "": df[headers_].iloc[i] = f"Error{i}"
-            
-            df["pdfName"] = pdf_Name
-            print(df)
-
-            return df
-
         enc = check_file_encoding(input_file)
         header = ""; header_contact = ""
         with open(text_file, "r", encoding=enc) as infile:
@@ -194,11 +164,12 @@ def process_pdf_return_data(input_file, output_file, pdf_Name):
                     if (len(pages)-len(headers)) > 1: headers.append(header_contact)
                     header_contact = ""; header = ""; b_header = False # reset
 
-                try:
-                    if b_get_page_header_data: header, header_contact, b_header = __process_header(line, header, header_contact)
-                    if b_get_page_date_data: date, b_date = __process_date(line, date, b_date)
-                    page, b_page = __process_page(line, page)
-                except Exception: pass
+                line_header, line_contact, line_date = classify_line(line)
+                if b_get_page_header_data:
+                    if line_header is not None: header = line_header; b_header = True
+                    elif line_contact is not None: header_contact = line_contact
+                if b_get_page_date_data and line_date is not None: date = line_date; b_date = True
+                page, b_page = _process_page(line, page)
                 
                 if b_header:
                     headers.append(header)
@@ -210,7 +181,7 @@ def process_pdf_return_data(input_file, output_file, pdf_Name):
                     b_get_page_date_data = False
             
             infile.close()
-        df = __post_process_data_into_df(pages=pages, headers=headers, 
+        df = _post_process_data_into_df(pages=pages, headers=headers, 
                                        dates=dates, pdf_Name=pdf_Name, b_same_dates=True)
         
         return df
@@ -219,6 +190,94 @@ def process_pdf_return_data(input_file, output_file, pdf_Name):
     df = _get_df_from_processed_text_file(text_file, input_file, pdf_Name)
     return df
 
+def _get_heading_prefixes(page_blocks, body_limit=DRIVERS_BODY_LIMIT):
+    '''
+        Rounded font size -> "# " .. "###### ", ranked
+        as pymupdf4llm does: the most frequent size (at
+        least body_limit) is body text, larger sizes are
+        headings, largest first.
+    '''
+    fontsizes = collections.Counter()
+    for blocks in page_blocks:
+        for block in blocks:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    text = span["text"].strip()
+                    if text: fontsizes[round(span["size"])] += len(text)
+    if fontsizes: body_limit = max(body_limit, max(fontsizes.items(), key=lambda i: (i[1], i[0]))[0])
+    sizes = sorted([size for size in fontsizes if size > body_limit], reverse=True)
+    return {size: "#" * min(i + 1, 6) + " " for i, size in enumerate(sizes)}
+
+def scan_pdf_pages(pdf_bytes, top_blocks=DRIVERS_TOP_BLOCKS):
+    '''
+        Lines per page, straight from the PDF: the top
+        text blocks and any contact line, headings
+        prefixed "# " .. "###### " as in the markdown.
+        No markdown conversion, no files.
+    '''
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_blocks = [page.get_text("dict", flags=pymupdf.TEXTFLAGS_TEXT, sort=True)["blocks"] for page in doc]
+    prefixes = _get_heading_prefixes(page_blocks)
+
+    page_lines = []
+    for blocks in page_blocks:
+        lines = []
+        for i_block, block in enumerate(blocks):
+            for line in block.get("lines", []):
+                spans = [span for span in line["spans"] if span["text"].strip()]
+                if not spans: continue
+                text = "".join(span["text"] for span in spans).strip()
+                if i_block < top_blocks or text.startswith("For additional") or "Outlook and Suggested" in text:
+                    lines.append(prefixes.get(max(round(span["size"]) for span in spans), "") + text)
+        page_lines.append(lines)
+    return page_lines
+
+def get_pages_headers_dates(page_lines):
+    '''
+        Per page: the DRIVERS header (else the contact
+        line's), and the first heading date; same line
+        rules as the markdown path.
+    '''
+    pages = []; headers = []; dates = []
+    for page, lines in enumerate(page_lines, start=1):
+        pages.append(page)
+        header = None; header_contact = ""; date = None
+        for line in lines:
+            line_header, line_contact, line_date = classify_line(line)
+            if header is None:
+                if line_header is not None: header = line_header
+                elif line_contact is not None: header_contact = line_contact
+            if date is None: date = line_date
+            if header is not None and date is not None: break
+        headers.append(header if header is not None else header_contact)
+        if date is not None: dates.append(date)
+    return pages, headers, dates
+
+def process_pdf_bytes(pdf_bytes, pdf_Name, extractor=DRIVERS_PDF_EXTRACTOR):
+    '''
+        Page metadata from downloaded bytes; module
+        level so a process pool can run it. extractor
+        "markdown" runs process_pdf_return_data on
+        temp files.
+    '''
+    if extractor == "scan":
+        pages, headers, dates = get_pages_headers_dates(scan_pdf_pages(pdf_bytes))
+        return _post_process_data_into_df(pages=pages, headers=headers, dates=dates, pdf_Name=pdf_Name,
+                                          b_same_dates=True, b_trailing_page=False)
+
+    file_name = pdf_Name.split("/")[-1][:-4]
+    with tempfile.NamedTemporaryFile(prefix=file_name, suffix=".txt", delete=False) as temp_file:
+        temp_file.write(pdf_bytes)
+        input_file = temp_file.name
+    with tempfile.NamedTemporaryFile(prefix=file_name, suffix="_output.md", delete=False) as temp_file:
+        output_file = temp_file.name
+    try:
+        return process_pdf_return_data(input_file, output_file, pdf_Name)
+    finally:
+        for file_path in (input_file, output_file):
+            try: os.remove(file_path)
+            except OSError: pass
+
 if __name__ == "__main__":
 
     pass
@@ -13,7 +13,10 @@ import datetime, tempfile
 from sqlalchemy.orm import sessionmaker
 import sqlalchemy as sa
 import pandas as pd, numpy as np
-import inspect, json
+import inspect, json, time
+import multiprocessing, collections, itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from azure.storage.blob import BlobServiceClient, ContentSettings, BlobClient, BlobType
 import azure.identity
 from azure.keyvault.secrets import SecretClient
@@ -24,6 +27,9 @@ except ModuleNotFoundError: import process_pdf as proc_pdf
 
 
 PROJECT_DIR = path.Path(__file__).parent.parent.parent
+DRIVERS_MAX_PROCESSES = os.cpu_count() or 1 # PDF parsing.
+DRIVERS_IO_WORKERS = 8 # Blob downloads and moves.
+DRIVERS_PDF_WINDOW = 2 # PDFs in flight per process; bounds the bytes held.
 
 class driver_pdfs():
 
@@ -97,59 +103,55 @@ class driver_pdfs():
         return az_sqldb
     
     def upload_drivers(self, df, az_sqldb):
+        '''
+            Upserts each pdfName in df into
+            tblDocumentDriverHistorical, the pdf read
+            from blob by OPENROWSET. One session.
+        '''
 
         def _execute_upsert(az_sqldb, df, tbl, pk):
             '''
-                Upsert data from df into tbl. Performs
-                a read on tbl using sql_get_string
-                and pk, the primary key.
+                Upsert data from df into tbl. Reads the
+                existing pdfNames once, then updates those
+                and inserts the rest.
             '''
 
-            blob_name = df["pdfName"].iloc[0]
-            df_azsql = az_sqldb.get_table_data_from_tbl_as_df(tbl, tbl.pdfName, blob_name)
-            if df_azsql.empty: 
-                df_azsql = pd.DataFrame(data={f"{pk}_":[None], "pdfName":[blob_name]})
-            df = df.merge(right=df_azsql[[f"{pk}_", "pdfName"]], left_on="pdfName", right_on="pdfName", 
-                        suffixes=(".file", ".db"))
-            df_up = df[~df[f"{pk}_"].isin([None])]
-            df_ins = df[df[f"{pk}_"].isin([None])]
-            
+            blob_names = df["pdfName"].drop_duplicates().to_list()
             Session = sessionmaker(az_sqldb.engine)
             with Session() as session:
+                existing = {row.pdfName for row in session.query(tbl.pdfName).where(tbl.pdfName.in_(blob_names))}
                 
-                # Simple update.
-                if not(df_up.empty): 
-                    sql_stmt_string = "".join(["DECLARE @pdf VARBINARY(MAX) SELECT @pdf = BulkColumn ",
-                        f"FROM OPENROWSET(BULK N'{blob_name}', ",
-                        "DATA_SOURCE = 'extHistoricalDriversBlob', "
-                        "SINGLE_BLOB) AS DOCUMENT; ",
-                        "UPDATE [dbo].[tblDocumentDriverHistorical] ",
-                        "SET "
-                        f"[pdfName] = '{blob_name}'",
-                        ", [pdf] = @pdf",
-                        ", [length] = DATALENGTH(@pdf)",
-                        "FROM [dbo].[tblDocumentDriverHistorical] ",
-                        f"WHERE [pdfName] = '{blob_name}'"
-                        ])
-                    # TODO: logger.info(sql_stmt_string)
-                    session.execute(sa.text(sql_stmt_string))
-
-                # Simple insert.
-                if not(df_ins.empty):
-                    sql_stmt_string = "".join(["DECLARE @pdf VARBINARY(MAX) SELECT @pdf = BulkColumn ",
-                        f"FROM OPENROWSET(BULK N'{blob_name}', ",
-                        "DATA_SOURCE = 'extHistoricalDriversBlob', "
-                        "SINGLE_BLOB) AS DOCUMENT; ",
-                        "INSERT INTO [dbo].[tblDocumentDriverHistorical] (",
-                        "[pdfName]",
-                        ", [pdf]",
-                        ", [length]",
-                        ") VALUES(",
-                        f"'{blob_name}'",
-                        ", @pdf",
-                        ", DATALENGTH(@pdf)",
-                        ")"
-                        ])
+                for blob_name in blob_names:
+                    # Simple update.
+                    if blob_name in existing: 
+                        sql_stmt_string = "".join(["DECLARE @pdf VARBINARY(MAX) SELECT @pdf = BulkColumn ",
+                            f"FROM OPENROWSET(BULK N'{blob_name}', ",
+                            "DATA_SOURCE = 'extHistoricalDriversBlob', "
+                            "SINGLE_BLOB) AS DOCUMENT; ",
+                            "UPDATE [dbo].[tblDocumentDriverHistorical] ",
+                            "SET "
+                            f"[pdfName] = '{blob_name}'",
+                            ", [pdf] = @pdf",
+                            ", [length] = DATALENGTH(@pdf)",
+                            "FROM [dbo].[tblDocumentDriverHistorical] ",
+                            f"WHERE [pdfName] = '{blob_name}'"
+                            ])
+                    # Simple insert.
+                    else:
+                        sql_stmt_string = "".join(["DECLARE @pdf VARBINARY(MAX) SELECT @pdf = BulkColumn ",
+                            f"FROM OPENROWSET(BULK N'{blob_name}', ",
+                            "DATA_SOURCE = 'extHistoricalDriversBlob', "
+                            "SINGLE_BLOB) AS DOCUMENT; ",
+                            "INSERT INTO [dbo].[tblDocumentDriverHistorical] (",
+                            "[pdfName]",
+                            ", [pdf]",
+                            ", [length]",
+                            ") VALUES(",
+                            f"'{blob_name}'",
+                            ", @pdf",
+                            ", DATALENGTH(@pdf)",
+                            ")"
+                            ])
                     # TODO: logger.info(sql_stmt_string)
                     session.execute(sa.text(sql_stmt_string))
         
@@ -159,45 +161,41 @@ class driver_pdfs():
 
     def upload_meta_data(self, df, az_sqldb):
         '''
-            Top, one entry is evaluated per dataframe. Limitation.
+            Page metadata for one or more PDFs (pdfName
+            column). PDFs without a document row are
+            skipped. One session.
         '''
 
         def _get_driver_doc_data(df, az_sqldb):
-            bExit = False
             tbl = self.TBL_DOCUMENT_DRIVER_HISTORICAL
-            pdf_Name = df["pdfName"].unique()[0]
-            df_az = az_sqldb.get_table_data_from_tbl_as_df(tbl, tbl.pdfName, pdf_Name)
-            if df_az.empty:
-                bExit = True
-            else:
-                df = df.merge(right=df_az[[f"id_", "pdfName"]], left_on="pdfName", 
-                            right_on="pdfName", suffixes=(".meta", ".doc"))
-                df.rename(columns={"id_": "documentId"}, inplace=True);
-
-            return df, bExit
+            pdf_Names = df["pdfName"].drop_duplicates().to_list()
+            Session = sessionmaker(az_sqldb.engine)
+            with Session() as session:
+                df_az = pd.DataFrame(data=[(row.id_, row.pdfName) for row in session.query(tbl.id_, tbl.pdfName).where(tbl.pdfName.in_(pdf_Names))],
+                                     columns=["documentId", "pdfName"])
+            df = df.merge(right=df_az, left_on="pdfName", right_on="pdfName", suffixes=(".meta", ".doc"))
+            return df, df.empty
 
         def _exec_upsert(df, az_sqldb):
-            # Check if in table: decide upsert:
+            # Replace each PDF's rows:
             
-            pk = int(df["documentId"].iloc[0])
-            try: pdfName = str(df["pdfName"].iloc[0])
-            except: pdfName = "nan"
+            pks = [int(pk) for pk in df["documentId"].unique()]
+            pdfNames = [str(pdfName) for pdfName in df["pdfName"].unique()]
             tbl = self.TBL_METADATA_DRIVER_HISTORICAL
-            df_ins = df
             Session = sessionmaker(az_sqldb.engine)
             with Session() as session:
                 
                 # Simple delete.
-                # logger.info(df_up.to_dict(orient="records"))
-                session.connection().execute(sa.delete(tbl).where(tbl.documentId.in_([pk])))
-                session.connection().execute(sa.delete(tbl).where(tbl.pdfName.in_([pdfName]))) # Just ensure.
-
-                # Simple insert.
-                sql_stmt_string = sa.insert(tbl).values(df_ins.to_dict(orient="records")).compile(
-                    dialect=sa.dialects.mssql.pyodbc.dialect(),
-                    compile_kwargs={"literal_binds":True}).string
-                # logger.info(sql_stmt_string)
-                session.execute(sa.text(sql_stmt_string))
+                session.connection().execute(sa.delete(tbl).where(tbl.documentId.in_(pks)))
+                session.connection().execute(sa.delete(tbl).where(tbl.pdfName.in_(pdfNames))) # Just ensure.
+
+                # Simple insert, one statement per PDF.
+                for _, df_ins in df.groupby("pdfName", sort=False):
+                    sql_stmt_string = sa.insert(tbl).values(df_ins.to_dict(orient="records")).compile(
+                        dialect=sa.dialects.mssql.pyodbc.dialect(),
+                        compile_kwargs={"literal_binds":True}).string
+                    # logger.info(sql_stmt_string)
+                    session.execute(sa.text(sql_stmt_string))
                 
                 # session.commit() # Set to autocommit for Az Syn.
                 session.close()
@@ -217,27 +215,104 @@ class driver_pdfs():
         self.container_client.delete_blob(blob=source_blob)
 
     def bulk_load_pdfs(self, az_sqldb, folder_name):
+        '''
+            Downloads overlap on a thread pool and feed a
+            process pool that parses (CPU bound); at most
+            DRIVERS_PDF_WINDOW PDFs per process are in
+            flight, bytes are released as results come
+            back. If the pool cannot start or breaks, the
+            remaining PDFs are parsed in-process. SQL is
+            written once every PDF is parsed: document
+            upserts, then metadata. Parsed PDFs are then
+            moved to drivers-historical-pdfs; a PDF that
+            fails to download or parse stays for the next
+            run. Workers are spawned, not forked, so they do
+            not inherit the SQL engine or blob clients.
+        '''
 
-        blob_list = self.container_client.list_blobs(name_starts_with=folder_name)
-        
-        for blob in blob_list:
-        
-            if blob.name.endswith(".pdf"):
-                blob_name = blob.name
-                self.upload_drivers(pd.DataFrame(data={"pdfName":[blob_name]}, columns=["pdfName"]), az_sqldb)
-                blob_client = self.container_client.get_blob_client(blob_name)
-                blob_data = blob_client.download_blob().readall()
-                file_name = blob.name.split("/")[-1][:-4]
-                with tempfile.NamedTemporaryFile(prefix=file_name, suffix=".txt", mode="a", delete=False) as temp_file:
-                    temp_file_path = temp_file.name
-                    with open(temp_file_path, 'wb') as f:
-                        f.write(blob_data)
-                        f.close()
-                with tempfile.NamedTemporaryFile(prefix=file_name, suffix="_output.md", mode="a", delete=False) as temp_file:
-                    output_file = temp_file.name
-                df = proc_pdf.process_pdf_return_data(temp_file_path, output_file, blob_name)
-                self.upload_meta_data(df=df, az_sqldb=az_sqldb)
-                self.upload_blob_to_azure(blob)
+        def _download(blob):
+            '''(blob, bytes); bytes is None if the download failed.'''
+            try:
+                return blob, self.container_client.get_blob_client(blob.name).download_blob().readall()
+            except Exception as e:
+                print(f"Failed to download {blob.name}: {e}")
+                logging.error(f"Failed to download {blob.name}: {e}")
+                return blob, None
+
+        def _iter_downloads(io_executor, blobs):
+            '''(blob, bytes) in order, at most DRIVERS_IO_WORKERS downloads ahead.'''
+            blobs = iter(blobs)
+            in_flight = collections.deque(io_executor.submit(_download, blob) for blob in itertools.islice(blobs, DRIVERS_IO_WORKERS))
+            while in_flight:
+                result = in_flight.popleft().result()
+                blob = next(blobs, None)
+                if blob is not None: in_flight.append(io_executor.submit(_download, blob))
+                yield result
+
+        def _collect(blob, get_df):
+            '''Records the parsed frame, or the failure; a broken pool is raised.'''
+            try:
+                results[blob.name] = (blob, get_df())
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                print(f"Failed to process {blob.name}: {e}")
+                logging.error(f"Failed to process {blob.name}: {e}")
+                failed.add(blob.name)
+
+        def _parse_in_pool(blobs):
+            n_processes = min(DRIVERS_MAX_PROCESSES, len(blobs))
+            with ThreadPoolExecutor(max_workers=DRIVERS_IO_WORKERS) as io_executor, \
+                ProcessPoolExecutor(max_workers=n_processes, mp_context=multiprocessing.get_context("spawn")) as pdf_executor:
+                in_flight = {}
+                for blob, blob_data in _iter_downloads(io_executor, blobs):
+                    if blob_data is None:
+                        failed.add(blob.name)
+                        continue
+                    in_flight[pdf_executor.submit(proc_pdf.process_pdf_bytes, blob_data, blob.name)] = blob
+                    blob_data = None
+                    if len(in_flight) >= DRIVERS_PDF_WINDOW * n_processes:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done: _collect(in_flight.pop(future), future.result)
+                for future in as_completed(in_flight): _collect(in_flight[future], future.result)
+
+        def _parse_in_process(blobs):
+            with ThreadPoolExecutor(max_workers=DRIVERS_IO_WORKERS) as io_executor:
+                for blob, blob_data in _iter_downloads(io_executor, blobs):
+                    if blob_data is None:
+                        failed.add(blob.name)
+                        continue
+                    _collect(blob, lambda: proc_pdf.process_pdf_bytes(blob_data, blob.name))
+
+        # Enter:
+        start = time.perf_counter()
+        blob_list = [blob for blob in self.container_client.list_blobs(name_starts_with=folder_name) if blob.name.endswith(".pdf")]
+        if not blob_list:
+            print(f"No PDFs in {folder_name}.")
+            return
+
+        results = {}; failed = set() # By blob name.
+        try:
+            _parse_in_pool(blob_list)
+        except (BrokenProcessPool, OSError) as e:
+            print(f"PDF process pool unavailable ({e}); parsing the remaining PDFs in-process.")
+            logging.warning(f"PDF process pool unavailable ({e}); parsing the remaining PDFs in-process.")
+            _parse_in_process([blob for blob in blob_list if blob.name not in results and blob.name not in failed])
+        results = list(results.values())
+        if not results: return
+
+        # SQL, batched:
+        blobs = [blob for blob, _ in results]
+        self.upload_drivers(pd.DataFrame(data={"pdfName":[blob.name for blob in blobs]}, columns=["pdfName"]), az_sqldb)
+        self.upload_meta_data(df=pd.concat([df for _, df in results], ignore_index=True), az_sqldb=az_sqldb)
+
+        # Move to historical:
+        with ThreadPoolExecutor(max_workers=DRIVERS_IO_WORKERS) as io_executor:
+            list(io_executor.map(self.upload_blob_to_azure, blobs))
+
+        elapsed = time.perf_counter() - start
+        print(f"Loaded {len(blobs)}/{len(blob_list)} PDFs in {elapsed:.1f} s ({len(blobs) / (elapsed / 60):.1f} PDFs/min).")
+        logging.info(f"Driver PDFs: {len(blobs)}/{len(blob_list)} loaded in {elapsed:.1f} s, {len(blobs) / (elapsed / 60):.1f} PDFs/min.")
 
     def main(self):
         
@@ -1,37 +1,241 @@
 import requests, json
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
+import os, re, time, logging
+import pandas as pd
+from urllib.parse import urlencode
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+try: import eia.src.http_cache as http_cache
+except ModuleNotFoundError: import http_cache
+try: import eia.src.http_client as http_client
+except ModuleNotFoundError: import http_client
+
+
+EIA_MAX_PAGE_LENGTH = 5000 # EIA v2 row cap per request.
+EIA_CACHE_TTL = 10 * 60 # /data/ pages: a retry reuses them, a later run sees a newly published week.
+EIA_RATE = 5.0 # Requests/second per host, before backing off on 429s.
+EIA_METADATA_TTL = 7 * 24 * 60 * 60 # Route facets/frequencies rarely change.
+
+
+def redact_url(url: str) -> str:
+    '''Hides the api_key for logging.'''
+    return re.sub(r"(api_key=)[^&]+", r"\1***", url)
+
+
+def split_frame_by_facet(df, facet: str, values: list) -> dict:
+    '''
+        Splits a multi-facet response back into one
+        frame per facet value, e.g. the "process"
+        column into {"YUP": df, "YRL": df}. Values
+        with no rows get an empty frame.
+    '''
+    if df.empty or facet not in df.columns:
+        return {v: df.iloc[0:0].copy() for v in values}
+    groups = {v: df_.reset_index(drop=True) for v, df_ in df.groupby(facet, sort=False)}
+    return {v: groups.get(v, df.iloc[0:0].copy()) for v in values}
+
+
+class CachedRateLimitedAdapter(http_cache.CachingAdapter, http_client.RateLimitedAdapter):
+    '''Disk cache in front of the rate limiter: hits never spend a token.'''
 
 
 class RESTAPI():
+    '''
+        Shared client: one pooled session, requests
+        issued concurrently. Not tied to a pipeline.
+    '''
+
+    def __init__(self, max_workers: int=8, cache_ttl: float=EIA_CACHE_TTL, rate: float=EIA_RATE):
+        # Rate limited per host, retries 429/5xx honoring Retry-After.
+        # Pool sized to the worker count so threads never wait on a connection.
+        adapter = http_client.RateLimitedAdapter(rate=rate, max_concurrency=max_workers,
+                                                 pool_connections=max_workers, pool_maxsize=max_workers)
+        # api.eia.gov answers are also cached on disk (api_key is not part of the key), for minutes
+        # only: pulls from the watermark must see a new week. Route metadata is kept for
+        # EIA_METADATA_TTL by EIARouteClient.
+        self.cache = CachedRateLimitedAdapter(name="eia", ttl=cache_ttl, rate=rate, max_concurrency=max_workers,
+                                              pool_connections=max_workers, pool_maxsize=max_workers)
 
-    def __init__(self):
-          pass
-    
-    def execute_calls_get_objects(self, endpoint_list:list, dataset:list):
-        # Define the retry strategy.
-        retry_strategy = Retry(
-            total=4,  # Maximum number of retries.
-            status_forcelist=[429, 500, 502, 503, 504],  # the HTTP status codes to retry on.
-        )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        
         # Create a new session object.
-        session = requests.Session()
-        session.mount("https://", adapter)
-        
-        # ref op cap: 
-        responses_dict = {}
-        for n, data in enumerate(dataset):
-            keys = [k for k in data.keys()]; key = keys[0]
-            response = session.get(endpoint_list[n])
-            status_code = response.status_code
-            if status_code == 200:
-                print(f"Success: {status_code}. {endpoint_list[n]}")
-                responses_dict[data[key]]=response
-            else:
-                print(f"Failed: {status_code}. {endpoint_list[n]}")
-                responses_dict[data[key]] = []
-
-        return responses_dict
\ No newline at end of file
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("https://api.eia.gov/", self.cache)
+        self.max_workers = max_workers
+        self.latencies = {}
+
+    def get(self, endpoint: str, params: dict=None):
+        '''Returns (response, latency in seconds).'''
+        start = time.perf_counter()
+        response = self.session.get(endpoint, params=params)
+        latency = time.perf_counter() - start
+        logging.info(f"GET {response.status_code} {latency*1000:.0f} ms {redact_url(response.url)}")
+        return response, latency
+
+    def iter_paginated_frames(self, endpoint: str, params: dict=None, page_length: int=EIA_MAX_PAGE_LENGTH):
+        '''
+            Generator over an EIA v2 data endpoint, one
+            DataFrame per page, in offset order.
+
+            The first page gives response.total; the
+            remaining offsets are then fetched concurrently
+            with at most max_workers pages in flight, so
+            memory stays bounded by the window, not the
+            history. Raises on a failed page.
+        '''
+        def _get_page(offset):
+            params_ = dict(params or {}); params_["offset"] = offset; params_["length"] = page_length
+            response, _ = self.get(endpoint, params=params_)
+            response.raise_for_status()
+            return response.json()["response"]
+
+        first_page = _get_page(0)
+        total = int(first_page.get("total", 0))
+        yield pd.DataFrame(data=first_page["data"])
+        del first_page
+
+        offsets = iter(range(page_length, total, page_length))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = deque()
+            for offset in offsets:
+                in_flight.append(executor.submit(_get_page, offset))
+                if len(in_flight) >= self.max_workers: break
+            while in_flight:
+                page = in_flight.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None: in_flight.append(executor.submit(_get_page, offset))
+                yield pd.DataFrame(data=page["data"])
+
+    def execute_paginated_calls_get_frames(self, endpoint_list:list, dataset:list, page_fn=None):
+        '''
+            Fetches endpoint_list[n] for dataset[n] concurrently,
+            each read to the end and its pages concatenated.
+            Returns DataFrames keyed by facet value, e.g.
+            {"process": df, "product": df}. Wall time per
+            endpoint is kept in self.latencies. page_fn:
+            optional DataFrame ->
+            DataFrame run on each page as it arrives (e.g.
+            filter rows, drop columns); only its output is
+            kept, the raw page is released.
+        '''
+        def _read_all(endpoint):
+            start = time.perf_counter()
+            frames = []
+            for df_page in self.iter_paginated_frames(endpoint):
+                frames.append(df_page if page_fn is None else page_fn(df_page))
+                del df_page
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame({})
+            return df, time.perf_counter() - start
+
+        keys = [list(data.values())[0] for data in dataset]
+        n_workers = max(1, min(self.max_workers, len(endpoint_list)))
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_read_all, endpoint_list))
+
+        frames_dict = {}
+        for key, endpoint, (df, latency) in zip(keys, endpoint_list, results):
+            self.latencies[key] = latency
+            print(f"Success: {len(df)} rows. {latency*1000:.0f} ms. {redact_url(endpoint)}")
+            frames_dict[key] = df
+        return frames_dict
+
+
+class EIARouteClient():
+    '''
+        Any EIA v2 route, e.g. "/petroleum/pnp/wiup",
+        "/natural-gas/pri/fut" or "/steo". Route
+        metadata (frequencies, facets, data columns)
+        and facet values are fetched once and kept
+        on disk as JSON for EIA_METADATA_TTL; queries
+        are built from it and validated before they
+        are sent.
+    '''
+
+    def __init__(self, rest_api, base_url: str, route: str, api_key: str, cache_dir=None, ttl: float=EIA_METADATA_TTL):
+        self.rest_api = rest_api
+        self.base_url = base_url.rstrip("/")
+        self.route = "/" + route.strip("/")
+        self.api_key = api_key
+        self.ttl = ttl
+        if cache_dir is None: cache_dir = http_cache.default_cache_dir() / "eia_metadata"
+        self.cache_path = os.path.join(cache_dir, self.route.strip("/").replace("/", "_") + ".json")
+        self._cache = None
+
+    def _load_cache(self):
+        if self._cache is None:
+            try:
+                with open(self.cache_path, "r") as f: self._cache = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w") as f: json.dump(self._cache, f)
+        os.replace(temp_path, self.cache_path)
+
+    def _get_cached(self, name, url):
+        '''response of url, from disk while younger than ttl.'''
+        cache = self._load_cache()
+        entry = cache.get(name)
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+            return entry["response"]
+        response, _ = self.rest_api.get(url, params={"api_key": self.api_key})
+        response.raise_for_status()
+        cache[name] = {"fetched_at": time.time(), "response": response.json()["response"]}
+        self._save_cache()
+        return cache[name]["response"]
+
+    def get_metadata(self) -> dict:
+        return self._get_cached("metadata", f"{self.base_url}{self.route}/")
+
+    def get_frequencies(self) -> list:
+        return [frequency["id"] for frequency in self.get_metadata().get("frequency", [])]
+
+    def get_facets(self) -> list:
+        return [facet["id"] for facet in self.get_metadata().get("facets", [])]
+
+    def get_data_columns(self) -> list:
+        return list(self.get_metadata().get("data", {}).keys())
+
+    def get_facet_values(self, facet: str) -> list:
+        response = self._get_cached(f"facet:{facet}", f"{self.base_url}{self.route}/facet/{facet}/")
+        return [value["id"] for value in response.get("facets", [])]
+
+    def validate_query(self, frequency: str, data: list, facets: dict):
+        '''Raises ValueError naming the valid choices.'''
+        frequencies = self.get_frequencies()
+        if frequency not in frequencies:
+            raise ValueError(f"{self.route}: frequency '{frequency}' not in {frequencies}.")
+        data_columns = self.get_data_columns()
+        unknown = [col for col in data if col not in data_columns]
+        if unknown:
+            raise ValueError(f"{self.route}: data {unknown} not in {data_columns}.")
+        route_facets = self.get_facets()
+        for facet, values in facets.items():
+            if facet not in route_facets:
+                raise ValueError(f"{self.route}: facet '{facet}' not in {route_facets}.")
+            facet_values = self.get_facet_values(facet)
+            unknown = [v for v in values if v not in facet_values]
+            if unknown:
+                raise ValueError(f"{self.route}: {facet} values {unknown} not found.")
+
+    def build_query(self, frequency: str, data: list=None, facets: dict=None, start: str=None, end: str=None,
+                    sort: list=None, b_validate: bool=True) -> str:
+        '''
+            Data endpoint URL without offset/length, e.g.
+            build_query("weekly", ["value"], {"process": ["YUP", "YRL"]},
+                        start="2025-01-03", sort=[("period", "desc")])
+        '''
+        data = data if data is not None else ["value"]
+        facets = {k: ([v] if isinstance(v, str) else list(v)) for k, v in (facets or {}).items()}
+        sort = sort if sort is not None else [("period", "desc")]
+        if b_validate: self.validate_query(frequency, data, facets)
+
+        params = [("api_key", self.api_key), ("frequency", frequency)]
+        params += [(f"data[{n}]", col) for n, col in enumerate(data)]
+        params += [(f"facets[{k}][]", v) for k, values in facets.items() for v in values]
+        if start is not None: params.append(("start", start))
+        if end is not None: params.append(("end", end))
+        for n, (col, direction) in enumerate(sort):
+            params += [(f"sort[{n}][column]", col), (f"sort[{n}][direction]", direction)]
+        return f"{self.base_url}{self.route}/data/?{urlencode(params, safe='[]')}"
@@ -81,6 +81,14 @@ class AzureSynapseInstance():
             df["date"] = None
         return df
     
+    def get_max_of_column(self, table_class_col_obj):
+        '''Returns MAX(col), e.g. a load watermark; None if empty.'''
+        Session = sessionmaker(self.engine)
+        with Session() as session:
+            val = session.execute(sa.select(sa.func.max(table_class_col_obj))).scalar()
+            session.close()
+        return val
+
     def process_dfs_for_upsert(self, df, tbl, pk):
         '''
             Processes df into two 
@@ -198,6 +206,18 @@ class AzureSynapseInstance():
         
         return tbl_stg_RefineryRates
 
+    def get_tbl_stg_STEOForecast(self):
+        class tbl_stg_STEOForecast(self._Base):
+            __tablename__ = "STEOForecast"
+            __table_args__ = {"schema": "stg"}
+            date: sa.orm.Mapped[datetime.date] = mapped_column("Date", sa.Date, primary_key=True) # First of month.
+            brepuus: sa.orm.Mapped[float] = mapped_column("BREPUUS", sa.Float, nullable=True) # Brent, $/bbl.
+            nghhmcf: sa.orm.Mapped[float] = mapped_column("NGHHMCF", sa.Float, nullable=True) # Henry Hub, $/mcf.
+            nghhuus: sa.orm.Mapped[float] = mapped_column("NGHHUUS", sa.Float, nullable=True) # Henry Hub, $/MMBtu.
+            wtipuus: sa.orm.Mapped[float] = mapped_column("WTIPUUS", sa.Float, nullable=True) # WTI, $/bbl.
+        
+        return tbl_stg_STEOForecast
+
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -67,7 +67,9 @@ def eia_download_http_reponse():
         # host1 = "rti-synapse-db.sql.azuresynapse.net" # SBX
         # host2 = "rti-synapse-pd.sql.azuresynapse.net" # PRD
         eia = pull_eia.eiaapi_refineryrates(host)
-        eia.refineryrates_main(route="/petroleum")
+        eia.refineryrates_main()
+        eia_forecast = pull_eia.eiaapi_forecast(host)
+        eia_forecast.forecast_main()
 
     except Exception as e:
         logger.error(e)
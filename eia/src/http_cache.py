@@ -0,0 +1,180 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-12
+# Notes: On-disk HTTP response cache for any
+# requests.Session, mounted as a transport adapter:
+#   session.mount("https://api.eia.gov/", CachingAdapter(name="eia", ttl=...))
+# Keyed by method + normalized URL (+ body hash for
+# opt-in POST); api keys, tokens and passwords are
+# stripped from the key and headers are not part of
+# it. Fresh entries are served from disk; stale ones
+# are revalidated with If-None-Match /
+# If-Modified-Since and a 304 refreshes them. The
+# directory is bounded by size, least recently used
+# entries go first. Only 200s are stored.
+####################################
+
+import os, json, time
+import hashlib, logging, tempfile, threading
+import pathlib as path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+SENSITIVE_PARAMS = {"api_key", "apikey", "key", "token", "access_token", "password", "pwd", "sig", "signature"}
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> path.Path:
+    '''HTTP_CACHE_DIR, else the (writable) temp dir.'''
+    return path.Path(os.environ.get("HTTP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "azfn_http_cache")))
+
+
+def normalize_url(url: str) -> str:
+    '''
+        Lower-cased scheme and host, sorted query,
+        no fragment, credentials removed, e.g.
+        "https://API.eia.gov/v2/x/?start=1&api_key=K"
+        -> "https://api.eia.gov/v2/x/?start=1".
+    '''
+    parts = urlsplit(url)
+    netloc = parts.hostname or ""
+    if parts.port: netloc += f":{parts.port}"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in SENSITIVE_PARAMS]
+    return urlunsplit((parts.scheme.lower(), netloc.lower(), parts.path or "/", urlencode(sorted(query)), ""))
+
+
+def cache_key(method: str, url: str, body=None) -> str:
+    key = f"{method.upper()} {normalize_url(url)}"
+    if body:
+        if isinstance(body, str): body = body.encode("utf8")
+        key += " " + hashlib.sha256(body).hexdigest()
+    return hashlib.sha256(key.encode("utf8")).hexdigest()
+
+
+class CachingAdapter(HTTPAdapter):
+    '''
+        ttl: seconds an entry is served without
+        asking the server. cache_post: also cache
+        POSTs (keyed on the body). store_if: optional
+        response -> bool check before storing a 200
+        (e.g. reject login pages). Other kwargs go
+        to HTTPAdapter (max_retries, pool sizes).
+    '''
+
+    def __init__(self, name: str="http", ttl: float=3600, cache_dir=None, max_bytes: int=DEFAULT_MAX_BYTES,
+                 cache_post: bool=False, store_if=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+        self.ttl = ttl
+        self.cache_dir = path.Path(cache_dir) if cache_dir is not None else default_cache_dir() / name
+        self.max_bytes = max_bytes
+        self.cache_post = cache_post
+        self.store_if = store_if
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0, "bytes_saved": 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def send(self, request, **kwargs):
+
+        def _is_cacheable(request):
+            if request.method in ("GET", "HEAD"): return True
+            return self.cache_post and request.method == "POST"
+
+        def _count(outcome, n_bytes=0):
+            with self._lock:
+                self.stats[outcome] += 1
+                if outcome != "miss": self.stats["bytes_saved"] += n_bytes
+            logging.info(f"HTTP cache {self.name} {outcome}: {request.method} {normalize_url(request.url)}")
+
+        # Enter:
+        if not _is_cacheable(request) or request.headers.get("Cache-Control", "").lower() == "no-cache":
+            return super().send(request, **kwargs)
+
+        key = cache_key(request.method, request.url, request.body if request.method == "POST" else None)
+        entry = self._load(key)
+        if entry is not None and time.time() - entry["stored_at"] < self.ttl:
+            _count("hit", len(entry["content"]))
+            return self._build_response(request, entry)
+
+        if entry is not None:
+            if entry["headers"].get("ETag"): request.headers["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"): request.headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self._store(key, request, entry["status_code"], entry["headers"], entry["content"])
+            _count("revalidated", len(entry["content"]))
+            return self._build_response(request, entry)
+
+        _count("miss")
+        if response.status_code == 200 and request.method != "HEAD" and (self.store_if is None or self.store_if(response)):
+            self._store(key, request, response.status_code, dict(response.headers), response.content)
+        return response
+
+    def _paths(self, key):
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r") as f: entry = json.load(f)
+            with open(body_path, "rb") as f: entry["content"] = f.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(meta_path) # LRU: mtime is last use.
+        return entry
+
+    def _store(self, key, request, status_code, headers, content):
+        '''Atomic write (temp + replace), then evict.'''
+        meta_path, body_path = self._paths(key)
+        headers = {k: v for k, v in headers.items() if k.lower() not in ("set-cookie", "content-encoding", "transfer-encoding")}
+        entry = {"url": normalize_url(request.url), "method": request.method, "status_code": status_code,
+                 "headers": headers, "stored_at": time.time()}
+        for file_path, mode, data in ((body_path, "wb", content), (meta_path, "w", json.dumps(entry))):
+            temp_path = file_path.with_suffix(file_path.suffix + f".{threading.get_ident()}.tmp")
+            with open(temp_path, mode) as f: f.write(data)
+            os.replace(temp_path, file_path)
+        self.evict()
+
+    def _build_response(self, request, entry):
+        response = Response()
+        response.status_code = entry["status_code"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["content"]
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "OK"
+        response.connection = self
+        return response
+
+    def evict(self):
+        '''Drops least recently used entries until under max_bytes.'''
+        with self._lock:
+            entries, total = [], 0
+            for meta_path in self.cache_dir.glob("*.json"):
+                body_path = meta_path.with_suffix(".body")
+                try:
+                    size = meta_path.stat().st_size + body_path.stat().st_size
+                    entries.append((meta_path.stat().st_mtime, meta_path, body_path, size))
+                except FileNotFoundError: continue
+                total += size
+            for _, meta_path, body_path, size in sorted(entries):
+                if total <= self.max_bytes: break
+                for file_path in (meta_path, body_path):
+                    try: os.remove(file_path)
+                    except FileNotFoundError: pass
+                total -= size
+
+    def clear(self):
+        for file_path in self.cache_dir.glob("*"):
+            try: os.remove(file_path)
+            except FileNotFoundError: pass
+
+    def log_stats(self):
+        stats = self.stats
+        print(f"HTTP cache {self.name}: {stats['hit']} hit, {stats['revalidated']} revalidated, {stats['miss']} miss, {stats['bytes_saved']/1e6:.2f} MB saved.")
+        logging.info(f"HTTP cache {self.name}: {stats}")
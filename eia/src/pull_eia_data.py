@@ -30,19 +30,18 @@ from typing import List
 from sqlalchemy.orm.session import sessionmaker
 try: import eia.src.azsynapse as azsyn
 except ModuleNotFoundError: import azsynapse as azsyn
-try: import eia.src.azsynapse as azsyn
-except ModuleNotFoundError: import azsynapse as azsyn
 try: import eia.src.api_requests as rest_api
 except ModuleNotFoundError: import api_requests as rest_api
 
 YUP = "YUP"
 YRL = "YRL"
 GINP = "EPXXX2"
+UTILIZATION_COLUMNS = ["period", "duoarea", "area-name", "value"] # Kept from each refinery-rates page.
 PROJECT_DIR = path.Path(__file__).parent.parent.parent
 
 class eiaapi_classbuilder():
 
-    def __init__(self, host: str, dataset_dict_list: List):
+    def __init__(self, host: str, dataset_dict_list: List, route: str=None):
 
         def _define_datasets(dataset_dict_list: List) -> List:
             '''
@@ -75,11 +74,33 @@ class eiaapi_classbuilder():
         self.dataset = _define_datasets(dataset_dict_list)
         self.eia_key = _define_eia_key()
         self.host = host
+        self.rest_api = rest_api.RESTAPI()
+        self.route = route
+        # Metadata-backed query builder for the route (cached on disk).
+        self.route_client = rest_api.EIARouteClient(self.rest_api, self.base_url, route, self.eia_key.value) if route else None
+
+    def get_dataset_facets(self) -> dict:
+        '''
+            Groups self.dataset by facet, e.g.
+            {"process": [YUP, YRL], "product": [GINP]}.
+        '''
+        facets = {}
+        for dataset in self.dataset:
+            for k, v in dataset.items(): facets.setdefault(k, []).append(v)
+        return facets
+
+    def get_az_syn(self, host):
+        # ODBC General authentication:
+        driver = "{ODBC Driver 18 for SQL Server}"
+        port = 1433
+        database = "synapsesqlserver"
+        timeout = "30"
+        return azsyn.AzureSynapseInstance(driver=driver, host=host, port=port, database=database, timeout=timeout)
 
 
 class eiaapi_refineryrates(eiaapi_classbuilder):
 
-    def __init__(self, host : str, route : str):
+    def __init__(self, host : str, route : str="/petroleum/pnp/wiup"):
         #  "/petroleum/pnp/wiup/data/?frequency=weekly&data[0]=value&facets[product][]=EPXXX2&sort[0][column]=period&sort[0][direction]=desc&offset=0&length=5000"
 
         def _define_datasets():
@@ -87,95 +108,75 @@ class eiaapi_refineryrates(eiaapi_classbuilder):
             return dataset
         
         dataset_dict_list = _define_datasets()
-        super().__init__(host, dataset_dict_list)
-        self.route = route
+        super().__init__(host, dataset_dict_list, route)
 
 
-    def get_data(self):
+    def get_data(self, start: str=None):
+        '''
+            start: first period to request, "YYYY-MM-DD".
+            Defaults to twelve weeks back; pages are
+            followed to the end, so any history length
+            can be pulled. Every week returned is kept.
+        '''
         
-        def _return_most_recent_friday__from_date(datetime_day):
-            weekday = datetime_day.weekday()
-            if weekday < 4: datetime_friday = datetime_day - datetime.timedelta(days=(weekday+3))
-            elif weekday == 4: datetime_friday = datetime_day
-            else: datetime_friday = datetime_day - datetime.timedelta(days=(weekday-4))
-            return datetime_friday
-        
-        def _dataset_handle_to_endpoints() -> list:
-            url = self.base_url + self.route
-            endpoint_list = [[f"pnp/wiup/data/?api_key={self.eia_key.value}&frequency=weekly&data[0]=value&facets[{k}][]={v}&sort[0][column]=period&sort[0][direction]=desc&offset=0&length=12" for k, v in dataset.items()] for dataset in self.dataset]
-            return [f"{url}{endpoint[0]}" for endpoint in endpoint_list]
+        def _dataset_handle_to_endpoints(start) -> dict:
+            '''
+                One endpoint per facet: values of the same
+                facet (e.g. both processes) share a request
+                as repeated facets[k][] parameters.
+            '''
+            facets = self.get_dataset_facets()
+            endpoint_dict = {}
+            for k, values in facets.items():
+                endpoint_dict[k] = self.route_client.build_query(frequency="weekly", data=["value"], facets={k: values}, start=start)
+            return endpoint_dict, facets
         
         def _process_into_utilization(df_dict):
-            
-            def __transform_df_for_azure(df):
-                '''
-                    Requires percent-utilization,
-                    and names.
-                '''
-                df_transform = pd.DataFrame({})
-                for col in df.columns:
-                    if col == "period":
-                        val = df[col].unique()[0]
-                        df_transform["Date"] = pd.Series(val)
-                    if col == "area-name":
-                        tr_cols = [tr_col.replace(" ", "") for tr_col in df[col].to_list()]
-                    if col == "percent-utilization":
-                        tr_vals = df[col].to_list()
-
-                for k, v in zip(tr_cols, tr_vals):
-                    df_transform[k] = pd.Series(v)
-                
-                return df_transform[["Date", "U.S.", "PADD3"]]
-
-            df_yup = pd.DataFrame({})
-            df_yrl = pd.DataFrame({})
-            df_ginp = pd.DataFrame({})
-
-            for k in df_dict.keys():
-                if k == YUP: 
-                    df_yup = df_dict[k]
-                elif k == YRL: 
-                    df_yrl = df_dict[k]
-                elif k == GINP: 
-                    df_ginp = df_dict[k]
-
-            columns = ["period", "duoarea", "area-name", "series-description", "value", "units"]
-            df_yup_ = df_yup[columns]
-            area_names = ["PADD 3", "U.S."]
-            merge_columns = columns[0:3]; columns.append("product-name")
-            df_ = df_yrl.merge(right=df_ginp[columns], how="inner", on=merge_columns, suffixes=("", ".ginp"))
-            filter_columns = columns.copy(); filter_columns.extend(["series-description.ginp", "value.ginp", "units.ginp"])
-            df_eia = df_[filter_columns]
-            df_eia = df_eia.drop(labels=["product-name"], axis=1)
-            map_names = {"series-description":"output-description", "value":"output-value", "units":"output-units", 
-                         "series-description.ginp":"input-description", "value.ginp":"input-value", "units.ginp":"input-units"}
-            map = {"output-description":str, "output-value":float, "output-units":str, 
-                         "input-description":str, "input-value":float, "input-units":str}
-            df_eia = df_eia.rename(columns=map_names)
-            df_eia = df_eia.astype(map)
-            df_eia["percent-utilization"] = (df_eia["input-value"]/df_eia["output-value"])*100
-            df_eia["percent-utilization"] = df_eia["percent-utilization"].round(2)
-            
-            datetime_friday = _return_most_recent_friday__from_date(datetime.datetime.today()); datestr_friday = datetime_friday.strftime("%Y-%m-%d")
-            datetime_prev_friday = datetime_friday - datetime.timedelta(days=7); datestr_prev_friday = datetime_prev_friday.strftime("%Y-%m-%d")
-            merge_columns.append("percent-utilization")
-            df_eia_fil = df_eia[(df_eia["period"]==datestr_friday) & (df_eia["area-name"].isin(area_names))][merge_columns]
-            if df_eia_fil.empty:
-                df_eia_fil = df_eia[(df_eia["period"]==datestr_prev_friday) & (df_eia["area-name"].isin(area_names))][merge_columns]
-            df_eia_fil.reset_index(drop=True, inplace=True)
-            df_eia_final = __transform_df_for_azure(df_eia_fil)
+            '''
+                Percent utilization = gross inputs (GINP) /
+                operable capacity (YRL), for every period and
+                area at once, pivoted wide: one row per period
+                ("Date"), one column per area, spaces removed
+                (e.g. "PADD 3" -> "PADD3").
+            '''
+            columns = UTILIZATION_COLUMNS
+            merge_columns = columns[0:3]
+            df_yrl = df_dict.get(YRL, pd.DataFrame({}))
+            df_ginp = df_dict.get(GINP, pd.DataFrame({}))
+            if df_yrl.empty or df_ginp.empty:
+                return pd.DataFrame({"Date":[], "U.S.":[], "PADD3":[]})
+
+            df_eia = df_yrl[columns].merge(right=df_ginp[columns], how="inner", on=merge_columns, suffixes=(".yrl", ".ginp"))
+            output_value = pd.to_numeric(df_eia["value.yrl"], errors="coerce")
+            input_value = pd.to_numeric(df_eia["value.ginp"], errors="coerce")
+            df_eia = df_eia.assign(**{"percent-utilization": (input_value/output_value*100).round(2),
+                                      "area": df_eia["area-name"].str.replace(" ", "", regex=False)})
+
+            df_eia_final = (df_eia.drop_duplicates(subset=["period", "area"], keep="last")
+                                  .pivot(index="period", columns="area", values="percent-utilization")
+                                  .sort_index())
+            df_eia_final.columns.name = None
+            df_eia_final = df_eia_final.reset_index().rename(columns={"period":"Date"})
             return df_eia_final
 
+        def _narrow_page(df_page):
+            '''
+                Each page as it arrives: periods from start,
+                only the columns used and the facet column,
+                so a long history is held narrow.
+            '''
+            if df_page.empty: return df_page
+            return df_page.loc[df_page["period"] >= start, [col for col in df_page.columns if col in UTILIZATION_COLUMNS or col in facets]]
+
         # Entry:
         # ``````
-        endpoint_list, dataset_list = _dataset_handle_to_endpoints(), self.dataset
-        responses_dict = rest_api.execute_calls_get_objects(endpoint_list=endpoint_list, dataset=dataset_list)
+        if start is None: start = (datetime.datetime.today() - datetime.timedelta(weeks=12)).strftime("%Y-%m-%d")
+        endpoint_dict, facets = _dataset_handle_to_endpoints(start)
+        facet_frames = self.rest_api.execute_paginated_calls_get_frames(endpoint_list=list(endpoint_dict.values()),
+                                                                        dataset=[{k: k} for k in endpoint_dict], page_fn=_narrow_page)
         df_dict = {}
-        for k in responses_dict:
-            response_object = responses_dict[k]
-            data_records = response_object.json()["response"]["data"]
-            df = pd.DataFrame(data=data_records)
-            df_dict[k] = df
+        for k, df in facet_frames.items():
+            df_dict.update(rest_api.split_frame_by_facet(df, k, facets[k]))
         
         df = _process_into_utilization(df_dict)
 
@@ -195,24 +196,17 @@ class eiaapi_refineryrates(eiaapi_classbuilder):
 
         def _exec_upsert(az_syn, df, tbl, pk):
             '''
-                Upsert data from df into tbl. Performs
-                a read on tbl using sql_get_string
-                and pk, the primary key.
+                Clears tbl (stg) and loads every row of
+                df in one parameterized batch.
             '''
             def __clear_zeroes(df):
-                df_ = pd.DataFrame({})
-                del_list = ['0.0', 'nan', 'None']
-                for col in df.columns:
-                    try: val = str(float(df[col].iloc[0]))
-                    except: val = str(df[col].iloc[0])
-                    if val in del_list:
-                        pass
-                    else:
-                        df_[col] = [df[col].iloc[0]]
-                return df_
+                '''0.0 and NaN are written as NULL.'''
+                return df.astype(object).where(df.notna() & df.ne(0.0), None)
 
             # Enter:
-            df = __clear_zeroes(df)
+            tbl_columns = [col.name for col in tbl.__table__.columns]
+            df = __clear_zeroes(df[[col for col in tbl_columns if col in df.columns]])
+            records = df.to_dict(orient="records")
 
             Session = sessionmaker(az_syn.engine)
             
@@ -225,32 +219,49 @@ class eiaapi_refineryrates(eiaapi_classbuilder):
                 logging.info(sql_del_string)
                 if "dbo" not in sql_del_string: session.execute(sa.text(sql_del_string)) # Safe guard.
 
-                sql_stmt_string = sa.insert(tbl).values(df.to_dict(orient="records")).compile(
-                    dialect=sa.dialects.mssql.pyodbc.dialect(),
-                    compile_kwargs={"literal_binds":True}).string
-                logging.info(sql_stmt_string)
-                session.execute(sa.text(sql_stmt_string))
+                # One executemany batch, keyed by column name:
+                session.execute(sa.insert(tbl.__table__), records)
+                logging.info(f"Inserted {len(records)} rows into {tbl.__table__.fullname}: {df[pk].min()} to {df[pk].max()}.")
                 
                 # session.commit() # Set to autocommit for Az Syn.
                 session.close()
         
+        if df.empty:
+            logging.info("No new EIA periods to load.")
+            return
+
         # Ensure type match:
         df = _clean_types(df)
 
-        # ODBC General authentication:
-        driver = "{ODBC Driver 18 for SQL Server}"
-        port = 1433
-        database = "synapsesqlserver"
-        timeout = "30"
-        
         # Get Data From Synapse:
-        az_syn = azsyn.AzureSynapseInstance(driver=driver, host=host, port=port, database=database, timeout=timeout)
+        az_syn = self.get_az_syn(host)
         tbl_stg_RefineryRates = az_syn.get_tbl_stg_RefineryRates()
         pk="Date"
         _exec_upsert(az_syn, df, tbl_stg_RefineryRates, pk)
 
-    def refineryrates_main(self, route):
-        self.upload_eia_data(host=self.host, df=self.get_data())
+    def get_watermark(self, host):
+        '''Latest Date already in stg.RefineryRates, or None.'''
+        az_syn = self.get_az_syn(host)
+        tbl_stg_RefineryRates = az_syn.get_tbl_stg_RefineryRates()
+        watermark = az_syn.get_max_of_column(tbl_stg_RefineryRates.date)
+        az_syn.dispose()
+        return watermark
+
+    def refineryrates_main(self, route=None):
+        '''
+            Incremental: requests only periods after the
+            watermark and loads all missing weeks at once.
+            No watermark falls back to the default window.
+        '''
+        watermark = self.get_watermark(self.host)
+        if watermark is not None:
+            if isinstance(watermark, str): watermark = datetime.datetime.strptime(watermark[:10], "%Y-%m-%d")
+            start = (watermark + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        else: start = None
+        logging.info(f"EIA refinery rates watermark: {watermark}; requesting from {start}.")
+        self.upload_eia_data(host=self.host, df=self.get_data(start=start))
+        self.rest_api.cache.log_stats()
+        self.rest_api.cache.log_host_stats()
     
 
 BREPUUS = "BREPUUS"
@@ -258,176 +269,103 @@ NGHHMCF = "NGHHMCF"
 NGHHUUS = "NGHHUUS"
 WTIPUUS = "WTIPUUS"
 
-class eiaapi_forecast():
+class eiaapi_forecast(eiaapi_classbuilder):
 
-    def __init__(self, host:str, endpoint:str):
+    def __init__(self, host:str, route:str="/steo"):
+        #  "/steo/data/?frequency=monthly&data[0]=value&facets[seriesId][]=BREPUUS&facets[seriesId][]=NGHHMCF&facets[seriesId][]=NGHHUUS&facets[seriesId][]=WTIPUUS&start=2023-01&end=2026-12&sort[0][column]=period&sort[0][direction]=desc"
         
         def _define_datasets():
-            dataset = [{"process":YUP}, {"process":YRL}, {"product":GINP}]
+            dataset = [{"seriesId":BREPUUS}, {"seriesId":NGHHMCF}, {"seriesId":NGHHUUS}, {"seriesId":WTIPUUS}]
             return dataset
         
         dataset_dict_list = _define_datasets()
-        super().__init__(host, dataset_dict_list)
-        
-        "https://api.eia.gov/v2/steo/data/?frequency=monthly&data[0]=value&facets[seriesId][]=BREPUUS&facets[seriesId][]=NGHHMCF&facets[seriesId][]=NGHHUUS&facets[seriesId][]=WTIPUUS&start=2023-01&end=2026-12&sort[0][column]=period&sort[0][direction]=desc&offset=0&length=5000"
-        #_dataset_handle_to_endpoints(dataset_dict_list)
-        
-
-
-    def get_data(self):
-        
-        def _return_most_recent_friday__from_date(datetime_day):
-            weekday = datetime_day.weekday()
-            if weekday < 4: datetime_friday = datetime_day - datetime.timedelta(days=(weekday+3))
-            elif weekday == 4: datetime_friday = datetime_day
-            else: datetime_friday = datetime_day - datetime.timedelta(days=(weekday-4))
-            return datetime_friday
-
-        def _process_into_utilization(df_dict):
-            
-            def __transform_df_for_azure(df):
-                '''
-                    Requires percent-utilization,
-                    and names.
-                '''
-                df_transform = pd.DataFrame({})
-                for col in df.columns:
-                    if col == "period":
-                        val = df[col].unique()[0]
-                        df_transform["Date"] = pd.Series(val)
-                    if col == "area-name":
-                        tr_cols = [tr_col.replace(" ", "") for tr_col in df[col].to_list()]
-                    if col == "percent-utilization":
-                        tr_vals = df[col].to_list()
-
-                for k, v in zip(tr_cols, tr_vals):
-                    df_transform[k] = pd.Series(v)
-                
-                return df_transform[["Date", "U.S.", "PADD3"]]
-
-            df_yup = pd.DataFrame({})
-            df_yrl = pd.DataFrame({})
-            df_ginp = pd.DataFrame({})
-
-            for k in df_dict.keys():
-                if k == YUP: 
-                    df_yup = df_dict[k]
-                elif k == YRL: 
-                    df_yrl = df_dict[k]
-                elif k == GINP: 
-                    df_ginp = df_dict[k]
-
-            columns = ["period", "duoarea", "area-name", "series-description", "value", "units"]
-            df_yup_ = df_yup[columns]
-            area_names = ["PADD 3", "U.S."]
-            merge_columns = columns[0:3]; columns.append("product-name")
-            df_ = df_yrl.merge(right=df_ginp[columns], how="inner", on=merge_columns, suffixes=("", ".ginp"))
-            filter_columns = columns.copy(); filter_columns.extend(["series-description.ginp", "value.ginp", "units.ginp"])
-            df_eia = df_[filter_columns]
-            df_eia = df_eia.drop(labels=["product-name"], axis=1)
-            map_names = {"series-description":"output-description", "value":"output-value", "units":"output-units", 
-                         "series-description.ginp":"input-description", "value.ginp":"input-value", "units.ginp":"input-units"}
-            map = {"output-description":str, "output-value":float, "output-units":str, 
-                         "input-description":str, "input-value":float, "input-units":str}
-            df_eia = df_eia.rename(columns=map_names)
-            df_eia = df_eia.astype(map)
-            df_eia["percent-utilization"] = (df_eia["input-value"]/df_eia["output-value"])*100
-            df_eia["percent-utilization"] = df_eia["percent-utilization"].round(2)
-            
-            datetime_friday = _return_most_recent_friday__from_date(datetime.datetime.today()); datestr_friday = datetime_friday.strftime("%Y-%m-%d")
-            datetime_prev_friday = datetime_friday - datetime.timedelta(days=7); datestr_prev_friday = datetime_prev_friday.strftime("%Y-%m-%d")
-            merge_columns.append("percent-utilization")
-            df_eia_fil = df_eia[(df_eia["period"]==datestr_friday) & (df_eia["area-name"].isin(area_names))][merge_columns]
-            if df_eia_fil.empty:
-                df_eia_fil = df_eia[(df_eia["period"]==datestr_prev_friday) & (df_eia["area-name"].isin(area_names))][merge_columns]
-            df_eia_fil.reset_index(drop=True, inplace=True)
-            df_eia_final = __transform_df_for_azure(df_eia_fil)
-            return df_eia_final
+        super().__init__(host, dataset_dict_list, route)
+
+    def get_forecast_window(self, today=None):
+        '''
+            ("YYYY-MM", "YYYY-MM"): January of last
+            year through December of next year.
+        '''
+        if today is None: today = datetime.date.today()
+        return f"{today.year-1}-01", f"{today.year+1}-12"
+
+    def get_data(self, start: str=None, end: str=None):
+        '''
+            All series in one paginated STEO request,
+            pivoted to one row per month ("Date") and
+            one column per seriesId.
+        '''
+
+        def _dataset_handle_to_endpoint(start, end) -> str:
+            return self.route_client.build_query(frequency="monthly", data=["value"], facets=self.get_dataset_facets(), start=start, end=end)
+
+        def _process_into_forecast(df):
+            series = [v for dataset in self.dataset for v in dataset.values()]
+            if df.empty:
+                return pd.DataFrame({"Date":[], **{s:[] for s in series}})
+            df = df.assign(value=pd.to_numeric(df["value"], errors="coerce"))
+            df_wide = (df.drop_duplicates(subset=["period", "seriesId"], keep="last")
+                         .pivot(index="period", columns="seriesId", values="value")
+                         .reindex(columns=series)
+                         .sort_index())
+            df_wide.columns.name = None
+            df_wide = df_wide.reset_index().rename(columns={"period":"Date"})
+            df_wide["Date"] = pd.to_datetime(df_wide["Date"], format="%Y-%m").dt.date
+            return df_wide
 
         # Entry:
         # ``````
-        endpoint_list, dataset = "", ""
-        responses_dict = rest_api.execute_calls_get_objects(endpoint_list=endpoint_list, dataset=dataset)
-        df_dict = {}
-        for k in responses_dict:
-            response_object = responses_dict[k]
-            data_records = response_object.json()["response"]["data"]
-            df = pd.DataFrame(data=data_records)
-            df_dict[k] = df
-        
-        df = _process_into_utilization(df_dict)
+        window_start, window_end = self.get_forecast_window()
+        if start is None: start = window_start
+        if end is None: end = window_end
+        endpoint = _dataset_handle_to_endpoint(start, end)
+        frames = self.rest_api.execute_paginated_calls_get_frames(endpoint_list=[endpoint], dataset=[{"seriesId":"seriesId"}])
+        df = _process_into_forecast(frames["seriesId"])
 
         return df
-    
+
     def upload_eia_data(self, host, df):
+        '''
+            Clears stg.STEOForecast and loads the
+            forecast window in one parameterized batch;
+            NaN is written as NULL.
+        '''
+        if df.empty:
+            logging.info("No STEO forecast rows to load.")
+            return
+
+        az_syn = self.get_az_syn(host)
+        tbl = az_syn.get_tbl_stg_STEOForecast()
+        tbl_columns = [col.name for col in tbl.__table__.columns]
+        df = df[[col for col in tbl_columns if col in df.columns]]
+        records = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+        Session = sessionmaker(az_syn.engine)
         
-        def _clean_types(df):
-                    # Date Col:
-                    df["Date"] = df["Date"].apply(lambda date_str: datetime.datetime.strptime(date_str, ("%Y-%m-%d")))
-                    # Other Cols:
-                    cols = pd.Series(df.columns)
-                    cols = cols[~cols.isin(["Date"])]
-                    types = (float for col in cols)
-                    frame_types = dict(zip(cols, types))
-                    return df.astype(dtype=frame_types)
-
-        def _exec_upsert(az_syn, df, tbl, pk):
-            '''
-                Upsert data from df into tbl. Performs
-                a read on tbl using sql_get_string
-                and pk, the primary key.
-            '''
-            def __clear_zeroes(df):
-                df_ = pd.DataFrame({})
-                del_list = ['0.0', 'nan', 'None']
-                for col in df.columns:
-                    try: val = str(float(df[col].iloc[0]))
-                    except: val = str(df[col].iloc[0])
-                    if val in del_list:
-                        pass
-                    else:
-                        df_[col] = [df[col].iloc[0]]
-                return df_
-
-            # Enter:
-            df = __clear_zeroes(df)
-
-            Session = sessionmaker(az_syn.engine)
+        with Session() as session:
             
-            with Session() as session:
-                
-                # Simple update w/ clear:
-                sql_del_string = sa.delete(tbl).compile(
-                    dialect=sa.dialects.mssql.pyodbc.dialect(),
-                    compile_kwargs={"literal_binds":True}).string
-                logging.info(sql_del_string)
-                if "dbo" not in sql_del_string: session.execute(sa.text(sql_del_string)) # Safe guard.
-
-                sql_stmt_string = sa.insert(tbl).values(df.to_dict(orient="records")).compile(
-                    dialect=sa.dialects.mssql.pyodbc.dialect(),
-                    compile_kwargs={"literal_binds":True}).string
-                logging.info(sql_stmt_string)
-                session.execute(sa.text(sql_stmt_string))
-                
-                # session.commit() # Set to autocommit for Az Syn.
-                session.close()
-        
-        # Ensure type match:
-        df = _clean_types(df)
-
-        # ODBC General authentication:
-        driver = "{ODBC Driver 18 for SQL Server}"
-        port = 1433
-        database = "synapsesqlserver"
-        timeout = "30"
-        
-        # Get Data From Synapse:
-        az_syn = azsyn.AzureSynapseInstance(driver=driver, host=host, port=port, database=database, timeout=timeout)
-        tbl_stg_RefineryRates = az_syn.get_tbl_stg_RefineryRates()
-        pk="Date"
-        _exec_upsert(az_syn, df, tbl_stg_RefineryRates, pk)
-
+            # Simple update w/ clear:
+            sql_del_string = sa.delete(tbl).compile(
+                dialect=sa.dialects.mssql.pyodbc.dialect(),
+                compile_kwargs={"literal_binds":True}).string
+            logging.info(sql_del_string)
+            if "dbo" not in sql_del_string: session.execute(sa.text(sql_del_string)) # Safe guard.
+
+            # One executemany batch, keyed by column name:
+            session.execute(sa.insert(tbl.__table__), records)
+            logging.info(f"Inserted {len(records)} rows into {tbl.__table__.fullname}: {df['Date'].min()} to {df['Date'].max()}.")
+            
+            # session.commit() # Set to autocommit for Az Syn.
+            session.close()
+        az_syn.dispose()
 
+    def forecast_main(self):
+        '''One STEO round trip for every series in the window.'''
+        start, end = self.get_forecast_window()
+        logging.info(f"EIA STEO forecast window: {start} to {end}.")
+        self.upload_eia_data(host=self.host, df=self.get_data(start=start, end=end))
+        self.rest_api.cache.log_stats()
+        self.rest_api.cache.log_host_stats()
 
 
 if __name__ == "__main__":
@@ -435,7 +373,7 @@ if __name__ == "__main__":
     with open(os.path.join(PROJECT_DIR,"local.settings.json")) as f:
         data = json.load(f)
         host = data["Values"]["SYNAPSE_INSTANCE"]
-        route = "/petroleum"
+        route = "/petroleum/pnp/wiup"
     
     eia = eiaapi_refineryrates(host=host, route=route)
     eia.refineryrates_main(route)
@@ -0,0 +1,146 @@
+####################################
+# Author: Jon Willinger
+# Date: 2025-03-26
+# Notes: Orbichem price history, one Parquet file per
+# series (e.g. capro.parquet), kept in a local
+# directory and in blob under
+# drivers-web-data/orbichem/history/. Runs diff only
+# the rows just returned (deduplicated by date, the
+# newest wins) and commit the history once the delta
+# has been written downstream. A series without
+# metadata is seeded once by the caller with its
+# full history. Blob metadata records rows, first/
+# last date and last update for each series; the last
+# date is the pull watermark. The local copy is used
+# while its etag matches the blob, so reads for
+# backfills or dashboards do not touch the website.
+####################################
+
+import os, io, json, tempfile
+import datetime
+import pandas as pd
+from azure.core.exceptions import ResourceNotFoundError
+
+ORBICHEM_HISTORY_DIRECTORY = "drivers-web-data/orbichem/history"
+
+
+class PriceHistoryStore():
+
+    def __init__(self, container_client=None, local_dir=None, blob_directory=ORBICHEM_HISTORY_DIRECTORY):
+        '''
+            container_client: azure ContainerClient, or None
+            for a local-only store (e.g. debugging).
+        '''
+        if local_dir is None: local_dir = os.environ.get("ORBICHEM_STORE_DIR", os.path.join(tempfile.gettempdir(), "orbichem_history"))
+        self.container_client = container_client
+        self.local_dir = local_dir
+        self.blob_directory = blob_directory
+        os.makedirs(local_dir, exist_ok=True)
+
+    def _local_paths(self, series):
+        return os.path.join(self.local_dir, f"{series}.parquet"), os.path.join(self.local_dir, f"{series}.json")
+
+    def _get_blob_client(self, series):
+        return self.container_client.get_blob_client(f"{self.blob_directory}/{series}.parquet")
+
+    def _read_local_metadata(self, series):
+        _, meta_path = self._local_paths(series)
+        try:
+            with open(meta_path, "r") as f: return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get_metadata(self, series) -> dict:
+        '''{"rows", "first_date", "last_date", "last_updated"}; None if the series is not stored.'''
+        if self.container_client is None: return self._read_local_metadata(series)
+        try:
+            properties = self._get_blob_client(series).get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+        return dict(properties.metadata)
+
+    def get_watermark(self, series):
+        '''Last stored price date (datetime), or None.'''
+        metadata = self.get_metadata(series)
+        if not metadata or not metadata.get("last_date"): return None
+        return datetime.datetime.strptime(metadata["last_date"], "%Y-%m-%d")
+
+    def read(self, series, start=None, end=None):
+        '''
+            Stored history, optionally within [start, end]
+            ("YYYY-MM-DD"). Local file if current, else
+            downloaded from blob and cached locally.
+        '''
+        data_path, meta_path = self._local_paths(series)
+        local_metadata = self._read_local_metadata(series)
+        if self.container_client is not None:
+            blob_client = self._get_blob_client(series)
+            try:
+                etag = blob_client.get_blob_properties().etag
+            except ResourceNotFoundError:
+                return pd.DataFrame({})
+            if local_metadata is None or local_metadata.get("etag") != etag or not os.path.exists(data_path):
+                with open(data_path, "wb") as f: f.write(blob_client.download_blob().readall())
+                with open(meta_path, "w") as f: json.dump({"etag": etag}, f)
+        elif not os.path.exists(data_path):
+            return pd.DataFrame({})
+
+        df = pd.read_parquet(data_path)
+        if start is not None: df = df[df["date"] >= start]
+        if end is not None: df = df[df["date"] <= end]
+        return df.reset_index(drop=True)
+
+    def diff(self, series, df_new):
+        '''
+            Compares df_new (one row per "date") with the
+            stored series, without writing anything.
+            Returns (df_delta, df_all): the rows that are
+            new or changed, and the history with them
+            applied (None when there is no delta).
+        '''
+        if df_new.empty: return df_new, None
+        df_old = self.read(series)
+        df_new = df_new.drop_duplicates(subset=["date"], keep="last")
+        if not df_old.empty and set(df_new.columns) <= set(df_old.columns):
+            # Row already stored unchanged (compared as text, dtypes may differ after Parquet):
+            columns = list(df_new.columns)
+            stored = set(df_old[columns].astype(str).itertuples(index=False, name=None))
+            b_known = [row in stored for row in df_new[columns].astype(str).itertuples(index=False, name=None)]
+            df_delta = df_new[[not b for b in b_known]]
+        else: df_delta = df_new
+        if df_delta.empty: return df_delta, None
+
+        df_all = (pd.concat([df_old, df_delta], ignore_index=True)
+                    .drop_duplicates(subset=["date"], keep="last")
+                    .sort_values("date").reset_index(drop=True))
+        return df_delta, df_all
+
+    def commit(self, series, df_all):
+        '''
+            Stores df_all from diff as the series history
+            and moves the watermark to its last date. Call
+            once the delta has been written downstream.
+        '''
+        metadata = {"rows": str(len(df_all)), "first_date": str(df_all["date"].min()), "last_date": str(df_all["date"].max()),
+                    "last_updated": datetime.datetime.now().isoformat(timespec="seconds")}
+
+        buffer = io.BytesIO()
+        df_all.to_parquet(buffer, index=False)
+        data_path, meta_path = self._local_paths(series)
+        with open(data_path, "wb") as f: f.write(buffer.getvalue())
+        local_metadata = dict(metadata)
+        if self.container_client is not None:
+            response = self._get_blob_client(series).upload_blob(buffer.getvalue(), overwrite=True, metadata=metadata)
+            local_metadata["etag"] = response["etag"]
+        with open(meta_path, "w") as f: json.dump(local_metadata, f)
+        print(f"{series}: {metadata['rows']} rows stored through {metadata['last_date']}.")
+
+    def merge(self, series, df_new):
+        '''
+            diff then commit: adds df_new to the series; a
+            date already stored is replaced. Returns the
+            rows that were new or changed.
+        '''
+        df_delta, df_all = self.diff(series, df_new)
+        if df_all is not None: self.commit(series, df_all)
+        return df_delta
@@ -2,15 +2,38 @@
 # https://orbichem360.orbichem.com/price/monitor/
 # Tecnon Orbichem
 
-import os, json, pathlib as path
-import requests
+import os, io, json, pathlib as path
+import requests, logging
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from datetime import datetime, timedelta
 from azure.storage.blob import BlobServiceClient, ContentSettings
+from azure.core.exceptions import ResourceNotFoundError
 import azure.identity
 from azure.keyvault.secrets import SecretClient
+try: import orbichem.src.http_cache as http_cache
+except ModuleNotFoundError: import http_cache
+try: import orbichem.src.price_store as price_store
+except ModuleNotFoundError: import price_store
 
 PROJECT_DIR = path.Path(__file__).parent.parent.parent
+ORBICHEM_CACHE_TTL = 12 * 60 * 60 # Monthly prices.
+ORBICHEM_MAX_WORKERS = 4 # Series requested at once.
+ORBICHEM_PRODUCTS_FILE = os.path.join(path.Path(__file__).parent.parent, "config", "products.json")
+ORBICHEM_PRICES_DIRECTORY = "drivers-web-data/orbichem/prices" # Combined, partitioned by month=YYYY-MM.
+ORBICHEM_HISTORY_START = datetime(2014, 1, 1) # Full history, seeds a series new to the price store.
+PRICE_COLUMNS = ['date', 'name', 'region', 'definition', 'primary_low', 'primary_high', 'converted_low', 'converted_high', 'price']
+
+
+def is_orbichem_price_response(response) -> bool:
+    '''
+        Price data JSON ({"price_data": [...]}); a 200
+        with the login page or an error body is not.
+    '''
+    try: body = response.json()
+    except ValueError: return False
+    return isinstance(body, dict) and "price_data" in body
+
 
 class orbichem_capro():
     
@@ -47,33 +70,211 @@ class orbichem_capro():
         self.storage_account_key_for_synapse = storage_account_key_for_synapse
         self.storage_account_name_for_synapse = storage_account_name_for_synapse
 
-    def upload_dataframe_to_azure_blob(self, dataframe, directory, file_name):
-
-        csv_data = dataframe.to_csv(index=False)
+    def upload_bytes_to_azure_blob(self, data, directory, file_name, content_type):
         container_name = "rti-synapse-db"
         blob_name = f"{directory}/{file_name}"
 
         blob_service_client = BlobServiceClient(account_url=f"https://{self.storage_account_name_for_synapse}.blob.core.windows.net",
                                                 credential=self.storage_account_key_for_synapse)
         blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-        blob_client.upload_blob(csv_data, blob_type="BlockBlob", overwrite=True, content_settings=ContentSettings(content_type='text/csv'))
+        blob_client.upload_blob(data, blob_type="BlockBlob", overwrite=True, content_settings=ContentSettings(content_type=content_type))
+
+    def upload_dataframe_to_azure_blob(self, dataframe, directory, file_name):
+
+        csv_data = dataframe.to_csv(index=False)
+        self.upload_bytes_to_azure_blob(csv_data, directory, file_name, 'text/csv')
+
+    def read_bytes_from_azure_blob(self, directory, file_name):
+        '''Blob content, or None if it does not exist.'''
+        blob_service_client = BlobServiceClient(account_url=f"https://{self.storage_account_name_for_synapse}.blob.core.windows.net",
+                                                credential=self.storage_account_key_for_synapse)
+        blob_client = blob_service_client.get_blob_client(container="rti-synapse-db", blob=f"{directory}/{file_name}")
+        try: return blob_client.download_blob().readall()
+        except ResourceNotFoundError: return None
+
+    def load_product_matrix(self):
+        '''
+            Series to pull, from config/products.json: one
+            entry per chemical/region/definition/currency
+            with its output directory.
+        '''
+        with open(ORBICHEM_PRODUCTS_FILE, "r") as f:
+            return json.load(f)["products"]
+
+    def get_price_store(self):
+        blob_service_client = BlobServiceClient(account_url=f"https://{self.storage_account_name_for_synapse}.blob.core.windows.net",
+                                                credential=self.storage_account_key_for_synapse)
+        return price_store.PriceHistoryStore(blob_service_client.get_container_client("rti-synapse-db"))
+
+    def read_price_history(self, series, start=None, end=None):
+        '''
+            Stored prices for a series (e.g. "capro"),
+            optionally within [start, end] "YYYY-MM-DD";
+            for backfills and dashboards, no login needed.
+        '''
+        return self.get_price_store().read(series, start, end)
+
+    def read_watermark(self, directory):
+        '''Last loaded month (datetime) from {directory}/_state.json, written before the price store; None if absent.'''
+        blob_service_client = BlobServiceClient(account_url=f"https://{self.storage_account_name_for_synapse}.blob.core.windows.net",
+                                                credential=self.storage_account_key_for_synapse)
+        blob_client = blob_service_client.get_blob_client(container="rti-synapse-db", blob=f"{directory}/_state.json")
+        try:
+            state = json.loads(blob_client.download_blob().readall())
+        except ResourceNotFoundError:
+            return None
+        return datetime.strptime(state["last_loaded_month"], "%Y-%m-%d")
 
     def main_capro(self):
-        
+        '''
+            Every series in the product matrix, fetched
+            concurrently over one logged-in session. Per
+            series: prices from the month after the last
+            stored date through the previous month, diffed
+            against the price history store. Only new or
+            changed rows are written on, one CSV per month
+            (e.g. capro_YYYYMMDD.csv) and into the month
+            partitions under ORBICHEM_PRICES_DIRECTORY;
+            then the store is committed. A series not yet
+            in the store is seeded once with its full
+            history from ORBICHEM_HISTORY_START; only the
+            months due are written on.
+            A series that fails is logged and skipped; the
+            others are still written.
+        '''
+
+        def _log_failure(product, step, e):
+            message = f"Orbichem series {product.get('series', product)} failed ({step}): {e}"
+            print(message)
+            logging.error(message)
+
+        def _get_plan(product):
+            '''
+                (product, start_month, b_seed): the month after
+                the last stored date, the previous month for
+                a new series; b_seed when the series is not
+                in the store yet. None on failure.
+            '''
+            try:
+                watermark = store.get_watermark(product["series"])
+                b_seed = watermark is None
+                if b_seed: watermark = self.read_watermark(product["directory"])
+            except Exception as e:
+                _log_failure(product, "watermark", e)
+                return None
+            if watermark is not None: start_month = (watermark + timedelta(days=32)).replace(day=1)
+            else: start_month = first_day_previous_month
+            print(f"{product['series']}: watermark {watermark}; writing {start_month.strftime('%Y-%m')} to {first_day_previous_month.strftime('%Y-%m')}"
+                  + (f"; seeding the store from {ORBICHEM_HISTORY_START.strftime('%Y-%m')}." if b_seed else "."))
+            return product, start_month, b_seed
+
+        def _fetch_prices(plan):
+            '''(plan, prices); prices is None if the request failed.'''
+            product, start_month, b_seed = plan
+            try: return plan, __request_prices(product, ORBICHEM_HISTORY_START if b_seed else start_month, b_seed)
+            except Exception as e:
+                _log_failure(product, "request", e)
+                return plan, None
+
+        def __request_prices(product, start_month, b_seed):
+            data = {
+                "start_date": f"{start_month.strftime('%m/%d/%Y')}",
+                "end_date": f"{first_day_of_current_month}",
+                "currency": product["currency"],
+                "cbf_group": product["cbf_group"],
+                "chemical[]": product["chemical"],
+                "uom_id": product["uom_id"],
+                "regions[]": [product["region"]],
+                "definitions[]": [product["definition"]],
+                "panel_states[dv_cont_1][data]": "",
+                "panel_states[dv_cont_1][time_scale]": "M",
+                "panel_states[dv_cont_4][data]": "",
+                "panel_states[dv_cont_4][time_scale]": "",
+                "product_id": product["product_id"]
+            }
+
+            # Send POST request to fetch data; pulls from the watermark always ask
+            # the site, a month not yet published must not be replayed from disk
+            # (a seed may be, its newer months are pulled again from the watermark):
+            response = session.post(self.capro_url, headers=headers if b_seed else {**headers, "Cache-Control": "no-cache"}, data=data)
+            response.raise_for_status()  # Raise an error for bad response status codes
+
+            # Every month from the watermark through the previous month:
+            df_prices = pd.DataFrame(response.json()['price_data'])
+            if df_prices.empty: return pd.DataFrame({col: [] for col in PRICE_COLUMNS})
+            month = pd.to_datetime(df_prices['date'], format='%Y-%m-%d')
+            df_prices = df_prices[(month >= start_month) & (month <= first_day_previous_month) & (month.dt.day == 1)]
+            df_prices = df_prices.drop_duplicates(subset=['date'], keep='last').sort_values('date')
+            return df_prices[PRICE_COLUMNS].reset_index(drop=True)
+
+        def _write_series(product, df_prices):
+            for _, series_df in df_prices.groupby('date', sort=True):
+                series_df = series_df.rename(columns={'date': 'price_date'}).reset_index(drop=True)
+                price_month = datetime.strptime(series_df['price_date'].iloc[0], '%Y-%m-%d')
+                file_name = f"{product['series']}_{price_month.strftime('%Y%m%d')}.csv"
+                self.upload_dataframe_to_azure_blob(dataframe=series_df,
+                        directory=product["directory"], file_name=file_name)
+                print(f"Uploaded {product['directory']}/{file_name}.")
+
+        def _write_partitions(df_all):
+            '''month=YYYY-MM/prices.{parquet,csv}, merged with any series already there.'''
+            df_all = df_all.assign(month=df_all['date'].str[:7])
+            for month, df_month in df_all.groupby('month', sort=True):
+                directory = f"{ORBICHEM_PRICES_DIRECTORY}/month={month}"
+                existing = self.read_bytes_from_azure_blob(directory, "prices.parquet")
+                df_month = df_month.drop(columns=['month'])
+                if existing is not None:
+                    df_month = pd.concat([pd.read_parquet(io.BytesIO(existing)), df_month], ignore_index=True)
+                df_month = df_month.drop_duplicates(subset=['series', 'date'], keep='last').sort_values(['series', 'date'])
+                parquet_buffer = io.BytesIO()
+                df_month.to_parquet(parquet_buffer, index=False)
+                self.upload_bytes_to_azure_blob(parquet_buffer.getvalue(), directory, "prices.parquet", 'application/octet-stream')
+                self.upload_dataframe_to_azure_blob(dataframe=df_month, directory=directory, file_name="prices.csv")
+                print(f"Uploaded {directory}: {df_month['series'].nunique()} series.")
+
+        # Enter:
         print("Executing")
         username = self.orbichem_uid.value
         password = self.orbichem_pw.value
         # Current date and time
-        current_date = datetime.now()
+        current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
         # First day of the current month
         first_day_of_current_month = current_date.replace(day=1).strftime('%m/%d/%Y')
 
         # First day of the previous month
         first_day_previous_month = (current_date.replace(day=1) - timedelta(days=1)).replace(day=1)
-        first_day_previous_month_formatted = first_day_previous_month.strftime('%Y-%m-%d')
+
+        # Series with months to write:
+        store = self.get_price_store()
+        products = self.load_product_matrix()
+        plans = [plan for plan in map(_get_plan, products)
+                 if plan is not None and (plan[2] or plan[1] <= first_day_previous_month)]
+        if not plans:
+            print("All Orbichem series are up to date.")
+            return
+
+        # Define request headers
+        headers = {
+            "accept": "application/json, text/javascript, */*; q=0.01",
+            "accept-language": "en-US,en;q=0.9,uz;q=0.8",
+            "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
+            "sec-ch-ua": "\"Not/A)Brand\";v=\"8\", \"Chromium\";v=\"126\", \"Google Chrome\";v=\"126\"",
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": "\"Windows\"",
+            "sec-fetch-dest": "empty",
+            "sec-fetch-mode": "cors",
+            "sec-fetch-site": "same-origin",
+            "x-requested-with": "XMLHttpRequest"
+        }
 
         with requests.Session() as session:
+            # Price history POSTs are cached on disk, keyed on the form body; only price JSON is stored:
+            cache = http_cache.CachingAdapter(name="orbichem", ttl=ORBICHEM_CACHE_TTL, cache_post=True,
+                                              store_if=is_orbichem_price_response,
+                                              pool_connections=ORBICHEM_MAX_WORKERS, pool_maxsize=ORBICHEM_MAX_WORKERS)
+            session.mount(self.capro_url, cache)
+
             # Login to the website
             login_payload = {
                 'username': username,
@@ -81,57 +282,29 @@ class orbichem_capro():
             }
             response = session.post(self.capro_login_url, data=login_payload)
 
-            # Define request headers and data
-            headers = {
-                "accept": "application/json, text/javascript, */*; q=0.01",
-                "accept-language": "en-US,en;q=0.9,uz;q=0.8",
-                "content-type": "application/x-www-form-urlencoded; charset=UTF-8",
-                "sec-ch-ua": "\"Not/A)Brand\";v=\"8\", \"Chromium\";v=\"126\", \"Google Chrome\";v=\"126\"",
-                "sec-ch-ua-mobile": "?0",
-                "sec-ch-ua-platform": "\"Windows\"",
-                "sec-fetch-dest": "empty",
-                "sec-fetch-mode": "cors",
-                "sec-fetch-site": "same-origin",
-                "x-requested-with": "XMLHttpRequest"
-            }
+            # All series over the one session:
+            with ThreadPoolExecutor(max_workers=min(ORBICHEM_MAX_WORKERS, len(plans))) as executor:
+                results = list(executor.map(_fetch_prices, plans))
+            cache.log_stats()
 
-            data = {
-                "start_date": "01/01/2014",
-                "end_date": f"{first_day_of_current_month}",
-                "currency": "USD",
-                "cbf_group": "9",
-                "chemical[]": "20",
-                "uom_id": "0",
-                "regions[]": ["9"],  # 9 - China
-                "definitions[]": ["1129"], # Domestic Spot
-                "panel_states[dv_cont_1][data]": "",
-                "panel_states[dv_cont_1][time_scale]": "M",
-                "panel_states[dv_cont_4][data]": "",
-                "panel_states[dv_cont_4][time_scale]": "",
-                "product_id": "20" # Caprolactam
-            }
-
-            # Send POST request to fetch data
-            response = session.post(self.capro_url, headers=headers, data=data)
-            response.raise_for_status()  # Raise an error for bad response status codes
-            
-            # Parse JSON response
-            json_data = response.json()
-
-            # Find matching entry for the first day of the previous month:
-            matching_entries = [entry for entry in json_data['price_data'] if entry['date'] == first_day_previous_month_formatted]
-
-            # Create DataFrame from matching entry
-            if matching_entries:
-                capro_df = pd.DataFrame(matching_entries[0], index=[0])
-                capro_df = capro_df[['date', 'name', 'region', 'definition', 'primary_low', 'primary_high', 'converted_low', 'converted_high', 'price']]
-                capro_df = capro_df.rename(columns={'date': 'price_date'})
-                # capro_df['load_date'] = today
-
-        directory = "drivers-web-data/capro"
-        file_name = f"capro_{first_day_previous_month.strftime('%Y%m%d')}.csv"
-        self.upload_dataframe_to_azure_blob(dataframe=capro_df,
-                directory=directory, file_name=file_name)
+        # Per series delta and CSVs, then the combined partitions; the store
+        # (history and watermark) is committed last, so a failed write is
+        # pulled again on the next run:
+        frames = []; commits = []
+        for (product, start_month, b_seed), df_prices in results:
+            if df_prices is None: continue # Logged in _fetch_prices.
+            df_prices, df_history = store.diff(product['series'], df_prices)
+            if df_history is not None: commits.append((product['series'], df_history))
+            # A seed stores the full history; only the months due are written on:
+            if b_seed: df_prices = df_prices[pd.to_datetime(df_prices['date'], format='%Y-%m-%d') >= start_month]
+            if df_prices.empty:
+                print(f"{product['series']}: no new prices returned.")
+                continue
+            _write_series(product, df_prices)
+            frames.append(df_prices.assign(series=product['series'], chemical=product['chemical'], region_id=product['region'],
+                                           definition_id=product['definition'], currency=product['currency']))
+        if frames: _write_partitions(pd.concat(frames, ignore_index=True))
+        for series, df_history in commits: store.commit(series, df_history)
         
 
 if __name__ == "__main__":